@@ -0,0 +1,27 @@
+-- Indexes declared in models.py, for databases whose job_data and host_data tables already exist.
+--
+-- create_all only creates indexes together with a new table, so run this once against an existing FRESCO database:
+--
+--     psql "host=$DBHOST dbname=$DBNAME user=$DBUSER" -f create_indexes.sql
+--
+-- Every statement is idempotent and builds its index without locking out writes. CREATE INDEX CONCURRENTLY cannot run
+-- inside a transaction block, so do not wrap the script in BEGIN/COMMIT or run it with psql --single-transaction. If a
+-- build is interrupted it leaves an INVALID index behind; drop that index and run the script again.
+
+-- host_data: the filtered column, then the keyset crud.py orders by
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hostdata_host_time ON host_data (host, time, event);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hostdata_jid_time ON host_data (jid, time, host, event);
+
+-- job_data: the filtered column, then the keyset crud.py orders by
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobdata_jid ON job_data (jid, start_time);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobdata_username ON job_data (username, start_time, jid);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobdata_jobname ON job_data (jobname, start_time, jid);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobdata_account ON job_data (account, start_time, jid);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobdata_exitcode ON job_data (exitcode, start_time, jid);
+
+-- job_data: GIN index for the host_list array containment lookups
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobdata_hostlist_gin ON job_data USING gin (host_list);
+
+-- Refresh the planner statistics so the new indexes are used straight away
+ANALYZE host_data;
+ANALYZE job_data;
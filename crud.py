@@ -1,14 +1,238 @@
+from datetime import datetime
+from typing import Optional
+from cachetools import TTLCache
+from cachetools.keys import hashkey
 import database_helpers as dbm
+import functools
 import logging
+import models
+import os
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keyset (seek) pagination keys. Each getter orders by a unique key so a page can resume right after the last
+# record of the previous one, which costs the same index seek no matter how deep the page is.
+HOST_DATA_KEYSET = ("time", "host", "event")
+JOB_DATA_KEYSET = ("start_time", "jid")
+
+# Explicit select lists in the field order of the record converters, so a column added to a table cannot shift the
+# positional conversion and unused columns are never read or sent over the wire
+HOST_DATA_COLUMNS = ", ".join(models.HostDataRecord._fields)
+JOB_DATA_COLUMNS = ", ".join(models.JobDataRecord._fields)
+# The same select list without reading host_list, which is the largest column and builds a Python list of strings
+# per row; the column is still returned, as NULL, so the records keep their shape
+JOB_DATA_COLUMNS_WITHOUT_HOSTS = JOB_DATA_COLUMNS.replace("host_list", "NULL::varchar[] AS host_list")
+
+# pg_hint_plan hint pinning host_list lookups to the GIN index. The planner's estimates for array containment swing
+# with the size of host_list and it sometimes falls back to a seq scan; without the extension the hint is a comment.
+# The index is built on existing databases by create_indexes.sql.
+HOST_LIST_INDEX_HINT = "/*+ BitmapScan(job_data ix_jobdata_hostlist_gin) */ "
+
+# Statements of the crud functions, composed once at import. The keyset-paginated ones get their ORDER BY and LIMIT
+# from _paginate; the strings are reused on every call and also serve as the prepared-statement cache keys.
+HOST_DATA_BY_HOST_SQL = f"SELECT {HOST_DATA_COLUMNS} FROM host_data WHERE host = %s"
+HOST_DATA_BY_JOB_SQL = f"SELECT {HOST_DATA_COLUMNS} FROM host_data WHERE jid = %s"
+HOST_DATA_BY_TIME_RANGE_SQL = f"SELECT {HOST_DATA_COLUMNS} FROM host_data WHERE time >= %s AND time < %s"
+HOST_DATA_BY_HOSTS_SQL = f"SELECT {HOST_DATA_COLUMNS} FROM host_data WHERE host = ANY(%s) LIMIT %s"
+HOST_DATA_BY_JOBS_SQL = (f"SELECT {HOST_DATA_COLUMNS} FROM (SELECT {HOST_DATA_COLUMNS}, row_number() OVER "
+                         "(PARTITION BY jid ORDER BY time, host, event) AS rn FROM host_data WHERE jid = ANY(%s)) ranked "
+                         "WHERE rn <= %s ORDER BY jid, time, host, event")
+STREAM_HOST_DATA_BY_JOB_SQL = f"{HOST_DATA_BY_JOB_SQL} LIMIT %s"
+JOB_DATA_BY_JOB_SQL = f"SELECT {JOB_DATA_COLUMNS} FROM job_data WHERE jid = %s"
+JOB_DATA_BY_USER_SQL = f"SELECT {JOB_DATA_COLUMNS} FROM job_data WHERE username = %s"
+JOB_DATA_BY_JOB_NAME_SQL = f"SELECT {JOB_DATA_COLUMNS} FROM job_data WHERE jobname = %s"
+JOB_DATA_BY_HOST_SQL = (f"{HOST_LIST_INDEX_HINT}SELECT {JOB_DATA_COLUMNS} FROM job_data "
+                        "WHERE host_list @> ARRAY[%s]::varchar[]")
+JOB_DATA_BY_ACCOUNT_SQL = f"SELECT {JOB_DATA_COLUMNS} FROM job_data WHERE account = %s"
+JOB_DATA_BY_EXIT_CODE_SQL = f"SELECT {JOB_DATA_COLUMNS} FROM job_data WHERE exitcode = %s"
+JOB_DATA_BY_JOBS_SQL = f"SELECT {JOB_DATA_COLUMNS} FROM job_data WHERE jid = ANY(%s) LIMIT %s"
+JOB_DATA_BY_HOSTS_SQL = (f"{HOST_LIST_INDEX_HINT}SELECT {JOB_DATA_COLUMNS} FROM job_data "
+                         "WHERE host_list && %s::varchar[] ORDER BY start_time, jid LIMIT %s")
+
+# Upper bound for any row_limit passed by a caller, so a single request cannot pull an unbounded result set
+MAX_ROWS = int(os.getenv("MAX_ROWS", "10000"))
+
+
+def _clamp_row_limit(row_limit: int) -> int:
+    """
+    Clamp a caller-supplied row limit to the range 1..MAX_ROWS.
+
+    :param row_limit: The requested maximum number of records.
+    :return: The row limit to bind to the LIMIT clause.
+    """
+    return max(1, min(int(row_limit), MAX_ROWS))
+
+
+@functools.lru_cache(maxsize=None)
+def _paginated_sql(query: str, keyset: tuple, with_cursor: bool) -> str:
+    """
+    Build the SQL text of a keyset-paginated query once per (query, keyset, cursor) combination.
+
+    The getters only ever produce a handful of distinct statements, so the composed strings are cached and the same
+    string object is handed to the driver on every call.
+
+    :param query: The SELECT statement including its WHERE clause.
+    :param keyset: The columns that uniquely order the records of the table.
+    :param with_cursor: Whether the statement resumes after a cursor.
+    :return: The complete SQL text including ORDER BY and LIMIT.
+    """
+    columns = ", ".join(keyset)
+    if with_cursor:
+        query += f" AND ({columns}) > ({', '.join(['%s'] * len(keyset))})"
+    return f"{query} ORDER BY {columns} LIMIT %s"
+
+
+@functools.lru_cache(maxsize=None)
+def _job_data_sql(query: str, include_hosts: bool) -> str:
+    """
+    Return a job data statement, with or without reading the host_list column.
+
+    :param query: A job data statement selecting JOB_DATA_COLUMNS.
+    :param include_hosts: Whether host_list is read; if not, every record's host_list is None.
+    :return: The statement to run.
+    """
+    return query if include_hosts else query.replace(JOB_DATA_COLUMNS, JOB_DATA_COLUMNS_WITHOUT_HOSTS, 1)
+
+
+def _paginate(query: str, params: tuple, keyset: tuple, after: Optional[tuple], row_limit: int):
+    """
+    Append keyset pagination to a filtered SELECT statement.
+
+    Adds a row-value comparison `(k1, k2, ...) > (%s, %s, ...)` when `after` is given, followed by an ORDER BY on the
+    keyset columns and the LIMIT. Unlike OFFSET, PostgreSQL does not need to scan and discard the skipped rows.
+
+    :param query: The SELECT statement including its WHERE clause.
+    :param params: The parameters of the WHERE clause.
+    :param keyset: The columns that uniquely order the records of the table.
+    :param after: The keyset values of the last record of the previous page, or None for the first page.
+    :param row_limit: The maximum number of records to return; clamped to MAX_ROWS.
+    :return: A tuple of the paginated query and its parameters.
+    """
+    row_limit = _clamp_row_limit(row_limit)
+    if after is None:
+        return _paginated_sql(query, keyset, False), params + (row_limit,)
+
+    if len(after) != len(keyset):
+        raise ValueError(f"Invalid pagination cursor. Expected {len(keyset)} values.")
+    return _paginated_sql(query, keyset, True), params + tuple(after) + (row_limit,)
+
+
+def _with_connection(function):
+    """
+    Lease a pooled database connection for the duration of a call and release it afterwards.
+
+    The wrapped function receives the connection as its first argument. This is the single place where crud
+    functions acquire and release connections and log query errors.
+
+    :param function: The function to wrap; its first parameter is the database connection.
+    :return: The wrapped function, which returns None if the database connection cannot be established.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        connection = dbm.get_database_connection()
+        if connection is None:
+            logger.error("Failed to establish database connection.")
+            return None
+
+        try:
+            return function(connection, *args, **kwargs)
+        except Exception as e:
+            logger.error("Error occurred in %s: %s", function.__name__, e)
+            raise
+        finally:
+            dbm.release_connection(connection)
+            logger.debug("Database connection released.")
+
+    return wrapper
+
+
+@_with_connection
+def _fetch_records(connection, query: str, params: tuple, conversion_function) -> list:
+    """
+    Execute a query and convert the fetched records into model instances.
+
+    :param connection: The leased database connection.
+    :param query: The complete SQL statement.
+    :param params: The parameters of the statement.
+    :param conversion_function: A function that takes a record tuple and returns a model instance.
+    :return: A list of model instances corresponding to the fetched records.
+    """
+    # execute_query logs the number of records fetched
+    records = dbm.execute_query(connection, query, params)
+
+    # convert records to model instances
+    return dbm.convert_to_model(records, conversion_function)
+
+
+def _fetch(query: str, params: tuple, keyset: tuple, after: Optional[tuple], row_limit: int,
+           conversion_function) -> list:
+    """
+    Run a keyset-paginated lookup and convert the fetched records into model instances.
+
+    This is the shared body of the single-key crud getters.
+
+    :param query: The SELECT statement including its WHERE clause.
+    :param params: The parameters of the WHERE clause.
+    :param keyset: The columns that uniquely order the records of the table.
+    :param after: The keyset values of the last record of the previous page, or None for the first page.
+    :param row_limit: The maximum number of records to return.
+    :param conversion_function: A function that takes a record tuple and returns a model instance.
+    :return: A list of model instances corresponding to the fetched records, or None if the database
+             connection cannot be established.
+    """
+    query, params = _paginate(query, params, keyset, after, row_limit)
+    return _fetch_records(query, params, conversion_function)
+
+
+# Short-lived cache for lookups that dashboards poll repeatedly with the same arguments
+_query_cache = TTLCache(maxsize=int(os.getenv("QUERY_CACHE_SIZE", "1024")), ttl=int(os.getenv("QUERY_CACHE_TTL", "30")))
+_query_cache_lock = threading.Lock()
+
+
+def _cached_query(function):
+    """
+    Cache the results of a crud getter for a short time.
+
+    Results are keyed on the function name and its arguments. Failed lookups (None) are not cached, and a copy of
+    the cached list is returned so callers cannot alter the cached entry.
+
+    :param function: The crud getter to wrap.
+    :return: The wrapped getter.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        key = hashkey(function.__name__, *args, **kwargs)
+        with _query_cache_lock:
+            records = _query_cache.get(key)
+        if records is not None:
+            logger.debug("Serving %s from the query cache.", function.__name__)
+            return list(records)
+
+        records = function(*args, **kwargs)
+        if records is not None:
+            with _query_cache_lock:
+                _query_cache[key] = tuple(records)
+        return records
+
+    return wrapper
+
+
+def clear_query_cache():
+    """
+    Remove every entry from the crud query cache of this process, e.g. to isolate tests from each other.
+    """
+    with _query_cache_lock:
+        _query_cache.clear()
+    logger.info("Query cache cleared.")
+
 
 # ------------------------------- Functions for the host_data table -------------------------------
 
-def get_host_data_by_host_id(host_id: str, row_limit: int = 100):
+@_cached_query
+def get_host_data_by_host_id(host_id: str, row_limit: int = 100, after: Optional[tuple] = None):
     """
     Retrieve host data records from the 'host_data' table filtered by the specified host ID.
 
@@ -19,35 +243,18 @@ def get_host_data_by_host_id(host_id: str, row_limit: int = 100):
 
     :param host_id: The unique identifier of the host for which to retrieve data.
     :param row_limit: The maximum number of records to return. Defaults to 100 if not specified.
+    :param after: The (time, host, event) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
     :return: A list of host data model instances corresponding to the fetched records, or None if the database
              connection cannot be established.
     """
-    logger.info(f"Fetching host data for host_id: {host_id} with row limit: {row_limit}")
-
-    connection = dbm.get_database_connection()
-    if connection is None:
-        logger.error("Failed to establish database connection.")
-        return None
-
-    query = "SELECT * FROM host_data WHERE host = %s LIMIT %s"
-    params = (host_id, row_limit)
-
-    try:
-        records = dbm.execute_query(connection, query, params)
-        logger.info(f"Successfully executed query. Number of records fetched: {len(records)}")
+    logger.debug("Fetching host data for host_id: %s with row limit: %s", host_id, row_limit)
 
-        # convert records to model instances
-        records = dbm.convert_to_model(records, dbm.record_to_host_data)
-        return records
-    except Exception as e:
-        logger.error(f"Error occurred in get_host_data_by_host_id: {e}")
-        raise
-    finally:
-        connection.close()
-        logger.info("Database connection closed.")
+    return _fetch(HOST_DATA_BY_HOST_SQL, (host_id,), HOST_DATA_KEYSET, after, row_limit, dbm.record_to_host_data)
 
 
-def get_host_data_by_job_id(job_data_id: str, row_limit: int = 100) -> list:
+@_cached_query
+def get_host_data_by_job_id(job_data_id: str, row_limit: int = 100, after: Optional[tuple] = None) -> list:
     """
     Retrieves host data records from the 'host_data' table filtered by the specified job data ID.
 
@@ -58,38 +265,115 @@ def get_host_data_by_job_id(job_data_id: str, row_limit: int = 100) -> list:
 
     :param job_data_id: The job data ID used to filter the records in the 'host_data' table.
     :param row_limit: The maximum number of records to return. Defaults to 100 if not specified.
+    :param after: The (time, host, event) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
     :return: A list of host data model instances corresponding to the fetched records. Returns None if the
              database connection cannot be established.
     """
-    logger.info(f"Fetching host data for host_id: {job_data_id} with row limit: {row_limit}")
+    logger.debug("Fetching host data for job_data_id: %s with row limit: %s", job_data_id, row_limit)
+
+    return _fetch(HOST_DATA_BY_JOB_SQL, (job_data_id,), HOST_DATA_KEYSET, after, row_limit, dbm.record_to_host_data)
+
+
+def stream_host_data_by_job_id(job_data_id: str, row_limit: int = 100):
+    """
+    Streams host data records from the 'host_data' table filtered by the specified job data ID.
+
+    This is the streaming counterpart of get_host_data_by_job_id, intended for exporters that handle large
+    row limits. Records are read through a server-side cursor and converted into model instances one at a time,
+    so memory usage stays constant regardless of the number of rows. The database connection is released once
+    the generator is exhausted or closed.
+
+    :param job_data_id: The job data ID used to filter the records in the 'host_data' table.
+    :param row_limit: The maximum number of records to return. Defaults to 100 if not specified.
+    :yield: Host data model instances corresponding to the fetched records.
+    :raises ConnectionError: If the database connection cannot be established. A generator cannot return None like
+                             the other getters, and ending it early would look like a job without host data.
+    """
+    logger.debug("Streaming host data for job_data_id: %s with row limit: %s", job_data_id, row_limit)
 
     connection = dbm.get_database_connection()
     if connection is None:
         logger.error("Failed to establish database connection.")
-        return None
+        raise ConnectionError("Failed to establish database connection.")
 
-    query = "SELECT * FROM host_data WHERE jid = %s LIMIT %s"
-    params = (job_data_id, row_limit)
+    query = STREAM_HOST_DATA_BY_JOB_SQL
+    params = (job_data_id, _clamp_row_limit(row_limit))
 
     try:
-        records = dbm.execute_query(connection, query, params)
-        logger.info(f"Successfully executed query. Number of records fetched: {len(records)}")
-
-        # convert records to model instances
-        records = dbm.convert_to_model(records, dbm.record_to_host_data)
-        return records
+        yield from dbm.convert_to_model(dbm.stream_query(connection, query, params), dbm.record_to_host_data)
     except Exception as e:
-        logger.error(f"Error occurred in get_host_data_by_job_id: {e}")
+        logger.error("Error occurred in stream_host_data_by_job_id: %s", e)
         raise
     finally:
-        connection.close()
-        logger.info("Database connection closed.")
+        dbm.release_connection(connection)
+        logger.debug("Database connection released.")
+
+
+def get_host_data_by_job_id_columnar(job_data_id: str, row_limit: int = 100, after: Optional[tuple] = None) -> dict:
+    """
+    Retrieves host data records for the specified job data ID in a column-oriented layout for analytics.
+
+    This runs the same query as get_host_data_by_job_id but returns one list per column instead of one model
+    instance per record, so no per-row Python object is built and the result loads directly into a DataFrame.
+
+    :param job_data_id: The job data ID used to filter the records in the 'host_data' table.
+    :param row_limit: The maximum number of records to return. Defaults to 100 if not specified.
+    :param after: The (time, host, event) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
+    :return: A dictionary mapping each 'host_data' column to the list of its values. Returns None if the
+             database connection cannot be established.
+    """
+    logger.debug("Fetching columnar host data for job_data_id: %s with row limit: %s", job_data_id, row_limit)
+
+    query, params = _paginate(HOST_DATA_BY_JOB_SQL, (job_data_id,), HOST_DATA_KEYSET, after, row_limit)
+    return _fetch_columns(query, params, models.HostDataRecord._fields)
+
+
+@_with_connection
+def _fetch_columns(connection, query: str, params: tuple, fields: tuple) -> dict:
+    """
+    Execute a query and transpose the fetched records into one list per column.
+
+    :param connection: The leased database connection.
+    :param query: The complete SQL statement.
+    :param params: The parameters of the statement.
+    :param fields: The column names, in select-list order.
+    :return: A dictionary mapping each column name to the list of its values.
+    """
+    records = dbm.execute_query(connection, query, params)
+    return dbm.convert_to_columns(records, fields)
+
+
+def get_host_data_by_time_range(start_time: datetime, end_time: datetime, row_limit: int = 100,
+                                after: Optional[tuple] = None) -> list:
+    """
+    Retrieves host data records from the 'host_data' table whose 'time' falls within the given range.
+
+    The range is half-open (start_time inclusive, end_time exclusive), so consecutive windows such as whole days
+    never overlap. Records are ordered by time, which lets PostgreSQL walk the index on 'time' and stop as soon as
+    row_limit records have been read instead of collecting the whole window first.
+
+    :param start_time: The start of the time range (inclusive).
+    :param end_time: The end of the time range (exclusive).
+    :param row_limit: The maximum number of records to return. Defaults to 100 if not specified.
+    :param after: The (time, host, event) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
+    :return: A list of host data model instances corresponding to the fetched records. Returns None if the
+             database connection cannot be established.
+    """
+    logger.debug("Fetching host data between %s and %s with row limit: %s", start_time, end_time, row_limit)
+
+    return _fetch(HOST_DATA_BY_TIME_RANGE_SQL, (start_time, end_time),
+                  HOST_DATA_KEYSET, after, row_limit, dbm.record_to_host_data)
 
 
 # ------------------------------- Functions for the job_data table -------------------------------
 
 
-def get_job_data_by_id(job_data_id: str, row_limit: int = 100) -> list:
+@_cached_query
+def get_job_data_by_id(job_data_id: str, row_limit: int = 100, after: Optional[tuple] = None,
+                       include_hosts: bool = True) -> list:
     """
     Retrieves job data records from the 'job_data' table filtered by the specified job data ID.
 
@@ -101,35 +385,21 @@ def get_job_data_by_id(job_data_id: str, row_limit: int = 100) -> list:
 
     :param job_data_id: The job data ID used to filter the records in the 'job_data' table.
     :param row_limit: The maximum number of records to return, defaults to 100 if not specified.
+    :param after: The (start_time, jid) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
+    :param include_hosts: Whether to read the host_list column. Defaults to True; if False, host_list is None.
     :return: A list of job data model instances corresponding to the fetched records. Returns None
              if the database connection cannot be established.
     """
-    logger.info(f"Fetching job data for job_data_id: {job_data_id} with row limit: {row_limit}")
-
-    connection = dbm.get_database_connection()
-    if connection is None:
-        logger.error("Failed to establish database connection.")
-        return None
-
-    query = "SELECT * FROM job_data WHERE jid = %s LIMIT %s"
-    params = (job_data_id, row_limit)
+    logger.debug("Fetching job data for job_data_id: %s with row limit: %s", job_data_id, row_limit)
 
-    try:
-        records = dbm.execute_query(connection, query, params)
-        logger.info(f"Successfully executed query. Number of records fetched: {len(records)}")
-
-        # Assuming a function like 'record_to_job_data' exists to convert records to model instances
-        records = dbm.convert_to_model(records, dbm.record_to_job_data)
-        return records
-    except Exception as e:
-        logger.error(f"Error occurred in get_job_data_by_id: {e}")
-        raise
-    finally:
-        connection.close()
-        logger.info("Database connection closed.")
+    return _fetch(_job_data_sql(JOB_DATA_BY_JOB_SQL, include_hosts), (job_data_id,), JOB_DATA_KEYSET, after,
+                  row_limit, dbm.record_to_job_data)
 
 
-def get_job_data_by_user(user_id: str, row_limit: int = 100) -> list:
+@_cached_query
+def get_job_data_by_user(user_id: str, row_limit: int = 100, after: Optional[tuple] = None,
+                         include_hosts: bool = True) -> list:
     """
     Retrieves job data records from the 'job_data' table filtered by the specified user ID.
 
@@ -141,35 +411,21 @@ def get_job_data_by_user(user_id: str, row_limit: int = 100) -> list:
 
     :param user_id: The user identifier used to filter the records in the 'job_data' table.
     :param row_limit: The maximum number of records to return, defaults to 100 if not specified.
+    :param after: The (start_time, jid) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
+    :param include_hosts: Whether to read the host_list column. Defaults to True; if False, host_list is None.
     :return: A list of job data model instances corresponding to the fetched records. Returns None
              if the database connection cannot be established.
     """
-    logger.info(f"Fetching job data for user_id: {user_id} with row limit: {row_limit}")
+    logger.debug("Fetching job data for user_id: %s with row limit: %s", user_id, row_limit)
 
-    connection = dbm.get_database_connection()
-    if connection is None:
-        logger.error("Failed to establish database connection.")
-        return None
-
-    query = "SELECT * FROM job_data WHERE username = %s LIMIT %s"
-    params = (user_id, row_limit)
-
-    try:
-        records = dbm.execute_query(connection, query, params)
-        logger.info(f"Successfully executed query. Number of records fetched: {len(records)}")
-
-        # Assuming a function like 'record_to_job_data' exists to convert records to model instances
-        records = dbm.convert_to_model(records, dbm.record_to_job_data)
-        return records
-    except Exception as e:
-        logger.error(f"Error occurred in get_job_data_by_user: {e}")
-        raise
-    finally:
-        connection.close()
-        logger.info("Database connection closed.")
+    return _fetch(_job_data_sql(JOB_DATA_BY_USER_SQL, include_hosts), (user_id,), JOB_DATA_KEYSET, after,
+                  row_limit, dbm.record_to_job_data)
 
 
-def get_job_data_by_job_name(job_name: str, row_limit: int = 100) -> list:
+@_cached_query
+def get_job_data_by_job_name(job_name: str, row_limit: int = 100, after: Optional[tuple] = None,
+                             include_hosts: bool = True) -> list:
     """
     Retrieves job data records from the 'job_data' table filtered by the specified job name.
 
@@ -180,70 +436,47 @@ def get_job_data_by_job_name(job_name: str, row_limit: int = 100) -> list:
 
     :param job_name: The name of the job used to filter the records.
     :param row_limit: The maximum number of records to return. Defaults to 100 if not specified.
+    :param after: The (start_time, jid) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
+    :param include_hosts: Whether to read the host_list column. Defaults to True; if False, host_list is None.
     :return: A list of job data model instances corresponding to the fetched records.
     """
 
-    logger.info(f"Fetching job data for job name: {job_name} with row limit: {row_limit}")
-
-    connection = dbm.get_database_connection()
-    if connection is None:
-        logger.error("Failed to establish database connection.")
-        return None
-
-    query = "SELECT * FROM job_data WHERE jobname = %s LIMIT %s"
-    params = (job_name, row_limit)
+    logger.debug("Fetching job data for job name: %s with row limit: %s", job_name, row_limit)
 
-    try:
-        records = dbm.execute_query(connection, query, params)
-        logger.info(f"Successfully executed query. Number of records fetched: {len(records)}")
-
-        return dbm.convert_to_model(records, dbm.record_to_job_data)
-    except Exception as e:
-        logger.error(f"Error occurred in get_job_data_by_job_name: {e}")
-        raise
-    finally:
-        connection.close()
-        logger.info("Database connection closed.")
+    return _fetch(_job_data_sql(JOB_DATA_BY_JOB_NAME_SQL, include_hosts), (job_name,), JOB_DATA_KEYSET, after,
+                  row_limit, dbm.record_to_job_data)
 
 
-def get_job_data_by_host_id(host_id: str, row_limit: int = 100) -> list:
+@_cached_query
+def get_job_data_by_host_id(host_id: str, row_limit: int = 100, after: Optional[tuple] = None,
+                            include_hosts: bool = True) -> list:
     """
     Retrieves job data records from the 'job_data' table filtered by the specified host ID.
 
     This function connects to the database and executes a query to fetch records from the 'job_data' table
-    where the 'host_list' column includes the given host_id. The number of records returned is limited to the
-    specified row_limit. After fetching the records, they are converted into model instances. Key events and
-    errors are logged during the process.
+    where the 'host_list' column includes the given host_id. Containment is expressed with the array operator `@>`
+    so PostgreSQL can answer it from the GIN index on 'host_list', and a pg_hint_plan hint keeps the planner on that
+    index. The number of records returned is limited to the specified row_limit. After fetching the records, they
+    are converted into model instances. Key events and errors are logged during the process.
 
     :param host_id: The host identifier used to filter the records in the 'job_data' table.
     :param row_limit: The maximum number of records to return. Defaults to 100 if not specified.
+    :param after: The (start_time, jid) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
+    :param include_hosts: Whether to read the host_list column. Defaults to True; if False, host_list is None.
     :return: A list of job data model instances corresponding to the fetched records.
     """
 
-    logger.info(f"Fetching job data for host ID: {host_id} with row limit: {row_limit}")
-
-    connection = dbm.get_database_connection()
-    if connection is None:
-        logger.error("Failed to establish database connection.")
-        return None
-
-    query = "SELECT * FROM job_data WHERE %s = ANY(host_list) LIMIT %s"
-    params = (host_id, row_limit)
-
-    try:
-        records = dbm.execute_query(connection, query, params)
-        logger.info(f"Successfully executed query. Number of records fetched: {len(records)}")
+    logger.debug("Fetching job data for host ID: %s with row limit: %s", host_id, row_limit)
 
-        return dbm.convert_to_model(records, dbm.record_to_job_data)
-    except Exception as e:
-        logger.error(f"Error occurred in get_job_data_by_host_id: {e}")
-        raise
-    finally:
-        connection.close()
-        logger.info("Database connection closed.")
+    return _fetch(_job_data_sql(JOB_DATA_BY_HOST_SQL, include_hosts), (host_id,), JOB_DATA_KEYSET, after,
+                  row_limit, dbm.record_to_job_data)
 
 
-def get_job_data_by_account(account_id: str, row_limit: int = 100) -> list:
+@_cached_query
+def get_job_data_by_account(account_id: str, row_limit: int = 100, after: Optional[tuple] = None,
+                            include_hosts: bool = True) -> list:
     """
     Retrieves job data records from the 'job_data' table filtered by the specified account ID.
 
@@ -254,33 +487,21 @@ def get_job_data_by_account(account_id: str, row_limit: int = 100) -> list:
 
     :param account_id: The account identifier used to filter the records in the 'job_data' table.
     :param row_limit: The maximum number of records to return. Defaults to 100 if not specified.
+    :param after: The (start_time, jid) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
+    :param include_hosts: Whether to read the host_list column. Defaults to True; if False, host_list is None.
     :return: A list of job data model instances corresponding to the fetched records.
     """
 
-    logger.info(f"Fetching job data for account ID: {account_id} with row limit: {row_limit}")
-
-    connection = dbm.get_database_connection()
-    if connection is None:
-        logger.error("Failed to establish database connection.")
-        return None
-
-    query = "SELECT * FROM job_data WHERE account = %s LIMIT %s"
-    params = (account_id, row_limit)
-
-    try:
-        records = dbm.execute_query(connection, query, params)
-        logger.info(f"Successfully executed query. Number of records fetched: {len(records)}")
+    logger.debug("Fetching job data for account ID: %s with row limit: %s", account_id, row_limit)
 
-        return dbm.convert_to_model(records, dbm.record_to_job_data)
-    except Exception as e:
-        logger.error(f"Error occurred in get_job_data_by_account: {e}")
-        raise
-    finally:
-        connection.close()
-        logger.info("Database connection closed.")
+    return _fetch(_job_data_sql(JOB_DATA_BY_ACCOUNT_SQL, include_hosts), (account_id,), JOB_DATA_KEYSET, after,
+                  row_limit, dbm.record_to_job_data)
 
 
-def get_job_data_by_exit_code(exit_code: str, row_limit: int = 100) -> list:
+@_cached_query
+def get_job_data_by_exit_code(exit_code: str, row_limit: int = 100, after: Optional[tuple] = None,
+                              include_hosts: bool = True) -> list:
     """
     Retrieves job data records from the 'job_data' table filtered by the specified exit code.
 
@@ -291,28 +512,194 @@ def get_job_data_by_exit_code(exit_code: str, row_limit: int = 100) -> list:
 
     :param exit_code: The exit code used to filter the records in the 'job_data' table.
     :param row_limit: The maximum number of records to return. Defaults to 100 if not specified.
+    :param after: The (start_time, jid) values of the last record of the previous page; only
+                  records ordered after it are returned. Defaults to None for the first page.
+    :param include_hosts: Whether to read the host_list column. Defaults to True; if False, host_list is None.
     :return: A list of job data model instances corresponding to the fetched records.
     """
 
-    logger.info(f"Fetching job data for exit code: {exit_code} with row limit: {row_limit}")
+    logger.debug("Fetching job data for exit code: %s with row limit: %s", exit_code, row_limit)
 
-    connection = dbm.get_database_connection()
-    if connection is None:
-        logger.error("Failed to establish database connection.")
-        return None
+    return _fetch(_job_data_sql(JOB_DATA_BY_EXIT_CODE_SQL, include_hosts), (exit_code,), JOB_DATA_KEYSET, after,
+                  row_limit, dbm.record_to_job_data)
 
-    query = "SELECT * FROM job_data WHERE exitcode = %s LIMIT %s"
-    params = (exit_code, row_limit)
 
-    try:
-        records = dbm.execute_query(connection, query, params)
-        logger.info(f"Successfully executed query. Number of records fetched: {len(records)}")
+# ------------------------------- Batch functions -------------------------------
 
-        return dbm.convert_to_model(records, dbm.record_to_job_data)
-    except Exception as e:
-        logger.error(f"Error occurred in get_job_data_by_exit_code: {e}")
-        raise
-    finally:
-        connection.close()
-        logger.info("Database connection closed.")
+def _order_by_keys(records: list, keys: list, attribute: str) -> list:
+    """
+    Reorder model instances so that they follow the order of the keys they were requested with.
+
+    Records sharing the same key keep their relative order. Duplicate keys are only emitted once.
+
+    :param records: The model instances returned by the batch query.
+    :param keys: The keys in the order the caller asked for them.
+    :param attribute: The model attribute holding the key of each record.
+    :return: A list of model instances grouped and ordered by the requested keys.
+    """
+    grouped = {}
+    for record in records:
+        grouped.setdefault(getattr(record, attribute), []).append(record)
+
+    ordered = []
+    for key in dict.fromkeys(keys):
+        ordered.extend(grouped.get(key, ()))
+    return ordered
+
+
+def get_host_data_by_host_ids(host_ids: list, row_limit: int = 100) -> list:
+    """
+    Retrieves host data records from the 'host_data' table for several host IDs in a single query.
+
+    This function replaces a loop of get_host_data_by_host_id calls with one round-trip to the database. The IDs
+    are passed as a single array parameter (`host = ANY(%s)`), so the statement text does not grow with the number
+    of IDs and is not subject to the driver's bind-parameter limit. The records are returned grouped in the order of
+    the given host IDs.
+
+    :param host_ids: The host identifiers for which to retrieve data.
+    :param row_limit: The maximum number of records to return in total. Defaults to 100 if not specified.
+    :return: A list of host data model instances ordered by the given host IDs. Returns None if the database
+             connection cannot be established.
+    """
+    logger.debug("Fetching host data for %s host IDs with row limit: %s", len(host_ids), row_limit)
+
+    if not host_ids:
+        return []
+
+    row_limit = _clamp_row_limit(row_limit)
+    records = _fetch_records(HOST_DATA_BY_HOSTS_SQL, (list(host_ids), row_limit), dbm.record_to_host_data)
+    return None if records is None else _order_by_keys(records, host_ids, 'host')
+
+
+def get_host_data_by_job_ids(job_data_ids: list, row_limit_per_job: int = 100) -> list:
+    """
+    Retrieves host data records from the 'host_data' table for several job IDs in a single query.
+
+    This function replaces a loop of get_host_data_by_job_id calls with one round-trip to the database. The IDs are
+    passed as a single array parameter (`jid = ANY(%s)`) and a `row_number()` window over each job caps the number
+    of records per job, so one busy job cannot crowd the others out of the result. The records are returned grouped
+    in the order of the given job IDs.
+
+    :param job_data_ids: The job identifiers for which to retrieve host data.
+    :param row_limit_per_job: The maximum number of records to return for each job. Defaults to 100 if not specified.
+    :return: A list of host data model instances ordered by the given job IDs. Returns None if the database
+             connection cannot be established.
+    """
+    logger.debug("Fetching host data for %s job IDs with row limit per job: %s", len(job_data_ids), row_limit_per_job)
+
+    if not job_data_ids:
+        return []
+
+    row_limit_per_job = _clamp_row_limit(row_limit_per_job)
+    records = _fetch_records(HOST_DATA_BY_JOBS_SQL, (list(job_data_ids), row_limit_per_job), dbm.record_to_host_data)
+    return None if records is None else _order_by_keys(records, job_data_ids, 'jid')
+
+
+def get_job_data_by_ids(job_data_ids: list, row_limit: int = 100) -> list:
+    """
+    Retrieves job data records from the 'job_data' table for several job IDs in a single query.
+
+    This is the batch counterpart of get_job_data_by_id: all IDs are sent as one array parameter
+    (`jid = ANY(%s)`) so N lookups cost a single round-trip. The records are returned grouped in the order of
+    the given job IDs.
+
+    :param job_data_ids: The job data IDs used to filter the records in the 'job_data' table.
+    :param row_limit: The maximum number of records to return in total. Defaults to 100 if not specified.
+    :return: A list of job data model instances ordered by the given job IDs. Returns None if the database
+             connection cannot be established.
+    """
+    logger.debug("Fetching job data for %s job IDs with row limit: %s", len(job_data_ids), row_limit)
+
+    if not job_data_ids:
+        return []
+
+    row_limit = _clamp_row_limit(row_limit)
+    records = _fetch_records(JOB_DATA_BY_JOBS_SQL, (list(job_data_ids), row_limit), dbm.record_to_job_data)
+    return None if records is None else _order_by_keys(records, job_data_ids, 'jid')
+
+
+def get_job_data_by_ids_columnar(job_data_ids: list, row_limit: int = 100) -> dict:
+    """
+    Retrieves job data records for several job IDs in a column-oriented layout for bulk exports.
+
+    This runs the same single query as get_job_data_by_ids but returns one list per 'job_data' column instead of one
+    model instance per record, so no 17-field object is built per row and the result loads directly into a
+    DataFrame. Records are returned in the order the database produces them.
+
+    :param job_data_ids: The job data IDs used to filter the records in the 'job_data' table.
+    :param row_limit: The maximum number of records to return in total. Defaults to 100 if not specified.
+    :return: A dictionary mapping each 'job_data' column to the list of its values. Returns None if the database
+             connection cannot be established.
+    """
+    logger.debug("Fetching columnar job data for %s job IDs with row limit: %s", len(job_data_ids), row_limit)
+
+    if not job_data_ids:
+        return {field: [] for field in models.JobDataRecord._fields}
+
+    row_limit = _clamp_row_limit(row_limit)
+    return _fetch_columns(JOB_DATA_BY_JOBS_SQL, (list(job_data_ids), row_limit), models.JobDataRecord._fields)
+
+
+def get_job_data_by_host_ids(host_ids: list, row_limit: int = 100) -> list:
+    """
+    Retrieves job data records from the 'job_data' table that ran on any of the specified hosts in a single query.
+
+    Instead of one `host_list @> ARRAY[...]` lookup per host, all host IDs are sent as one array parameter and
+    matched with the array overlap operator `&&`. PostgreSQL answers this with a single bitmap scan of the GIN index
+    on 'host_list', so the plan does not grow with the number of hosts. A job that ran on several of the hosts is
+    returned only once. Records are ordered by (start_time, jid).
+
+    :param host_ids: The host identifiers used to filter the records in the 'job_data' table.
+    :param row_limit: The maximum number of records to return in total. Defaults to 100 if not specified.
+    :return: A list of job data model instances corresponding to the fetched records. Returns None if the database
+             connection cannot be established.
+    """
+    logger.debug("Fetching job data for %s host IDs with row limit: %s", len(host_ids), row_limit)
+
+    if not host_ids:
+        return []
+
+    row_limit = _clamp_row_limit(row_limit)
+    return _fetch_records(JOB_DATA_BY_HOSTS_SQL, (list(host_ids), row_limit), dbm.record_to_job_data)
+
+
+def get_host_and_job_data_by_job_id(job_data_id: str, row_limit: int = 100) -> dict:
+    """
+    Retrieves the job data and the host data of a job in one call, e.g. for a job dashboard.
+
+    Both lookups run on the same leased connection, one after the other, instead of each acquiring and releasing its
+    own connection. Each statement goes through the prepared-statement cache of execute_query.
+
+    :param job_data_id: The job data ID used to filter the records in the 'job_data' and 'host_data' tables.
+    :param row_limit: The maximum number of records to return per table. Defaults to 100 if not specified.
+    :return: A dictionary with the job data model instances under "job" and the host data model instances under
+             "host". Returns None if the database connection cannot be established.
+    """
+    logger.debug("Fetching job and host data for job_data_id: %s with row limit: %s", job_data_id, row_limit)
+
+    job_query, job_params = _paginate(JOB_DATA_BY_JOB_SQL, (job_data_id,), JOB_DATA_KEYSET, None, row_limit)
+    host_query, host_params = _paginate(HOST_DATA_BY_JOB_SQL, (job_data_id,), HOST_DATA_KEYSET, None, row_limit)
+
+    return _fetch_job_and_host_data(job_query, job_params, host_query, host_params)
+
+
+@_with_connection
+def _fetch_job_and_host_data(connection, job_query: str, job_params: tuple, host_query: str, host_params: tuple):
+    """
+    Execute a job data and a host data query on the same connection and convert both results.
+
+    :param connection: The leased database connection.
+    :param job_query: The complete SQL statement for the 'job_data' table.
+    :param job_params: The parameters of the job data statement.
+    :param host_query: The complete SQL statement for the 'host_data' table.
+    :param host_params: The parameters of the host data statement.
+    :return: A dictionary with the job data model instances under "job" and the host data model instances under
+             "host".
+    """
+    job_records = dbm.execute_query(connection, job_query, job_params)
+    host_records = dbm.execute_query(connection, host_query, host_params)
 
+    return {
+        "job": dbm.convert_to_model(job_records, dbm.record_to_job_data),
+        "host": dbm.convert_to_model(host_records, dbm.record_to_host_data),
+    }
@@ -1,62 +1,205 @@
-import inspect
+import contextvars
+import itertools
 import os
+import re
+import threading
+import time
+import uuid
+import weakref
 import psycopg2
+import psycopg2.pool
 import logging
 import models
+from collections import OrderedDict
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Connection pool shared by all crud functions, created on first use. The semaphore makes callers wait for a free
+# connection instead of failing straight away when every pooled connection is leased.
+DB_POOL_MIN_CONN = int(os.getenv('DB_POOL_MIN_CONN', '1'))
+DB_POOL_MAX_CONN = int(os.getenv('DB_POOL_MAX_CONN', '20'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
 def get_database_connection():
     """
-    Establishes a connection to the PostgreSQL database using psycopg2.
+    Leases a connection to the PostgreSQL database from the shared psycopg2 connection pool.
 
-    This function attempts to establish a database connection using credentials
-    retrieved from environment variables (DBHOST, DBPW, DBNAME, DBUSER). If any
-    credential is missing or if the connection attempt fails, the function logs
-    the error and returns None.
+    This function retrieves credentials from environment variables (DBHOST, DBPW, DBNAME, DBUSER) and creates a
+    ThreadedConnectionPool on the first call only, so the credentials are read once and the TCP, TLS and
+    authentication handshake is paid once per pooled connection rather than once per request. The pool size is set by
+    DB_POOL_MIN_CONN and DB_POOL_MAX_CONN, which are read once at import. If any credential is missing, no connection
+    frees up within DB_POOL_TIMEOUT seconds or the connection attempt fails, the function logs the error and returns
+    None. Leased connections must be handed back with release_connection.
 
     :return: A psycopg2 database connection object if successful, None otherwise.
     """
+    global _pool, _pool_slots
     try:
-        # Retrieve database credentials
-        db_host = os.getenv('DBHOST')
-        db_password = os.getenv('DBPW')
-        db_name = os.getenv('DBNAME')
-        db_user = os.getenv('DBUSER')
-
-        # Log the presence of credentials
-        credentials_status = {
-            'DBHOST': 'present' if db_host else 'missing',
-            'DBNAME': 'present' if db_name else 'missing',
-            'DBUSER': 'present' if db_user else 'missing',
-            'DBPW': 'present' if db_password else 'missing'
-        }
-        logger.info(f"Database credentials status: {credentials_status}")
-
-        # Check all credentials are present
-        if not all([db_host, db_password, db_name, db_user]):
-            raise ValueError('One or more database credentials are missing.')
-
-        # Attempt to establish a database connection
-        connection = psycopg2.connect(host=db_host, dbname=db_name, user=db_user, password=db_password)
-        logger.info("Database connection established successfully.")
-        return connection
+        if _pool is None:
+            with _pool_lock:
+                if _pool is None:
+                    # Retrieve database credentials
+                    db_host = os.getenv('DBHOST')
+                    db_password = os.getenv('DBPW')
+                    db_name = os.getenv('DBNAME')
+                    db_user = os.getenv('DBUSER')
+
+                    # Log the presence of credentials
+                    credentials_status = {
+                        'DBHOST': 'present' if db_host else 'missing',
+                        'DBNAME': 'present' if db_name else 'missing',
+                        'DBUSER': 'present' if db_user else 'missing',
+                        'DBPW': 'present' if db_password else 'missing'
+                    }
+                    logger.info("Database credentials status: %s", credentials_status)
+
+                    # Check all credentials are present
+                    if not all([db_host, db_password, db_name, db_user]):
+                        raise ValueError('One or more database credentials are missing.')
+
+                    _pool = psycopg2.pool.ThreadedConnectionPool(
+                        DB_POOL_MIN_CONN, DB_POOL_MAX_CONN,
+                        host=db_host, dbname=db_name, user=db_user, password=db_password
+                    )
+                    _pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_CONN)
+                    logger.info("Database connection pool created successfully.")
+
+        if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise TimeoutError('Timed out waiting for a free database connection.')
+        try:
+            return _pool.getconn()
+        except Exception:
+            _pool_slots.release()
+            raise
     except Exception as error:
-        logger.error(f"Database connection error: {error}")
+        logger.error("Database connection error: %s", error)
         return None
 
 
+def release_connection(connection):
+    """
+    Returns a connection leased with get_database_connection to the connection pool.
+
+    The open transaction is rolled back first, so the connection goes back to the pool clean (the API only reads). A
+    connection that cannot be rolled back is discarded by the pool instead of being reused.
+
+    :param connection: The database connection object to release.
+    """
+    if _pool is None:
+        connection.close()
+        return
+
+    try:
+        connection.rollback()
+        _pool.putconn(connection)
+    except Exception as error:
+        logger.error("Discarding broken database connection: %s", error)
+        _pool.putconn(connection, close=True)
+    finally:
+        _pool_slots.release()
+
+
+def close_connection_pool():
+    """
+    Closes every connection in the connection pool, e.g. when the application shuts down.
+
+    The next call to get_database_connection creates a new pool.
+    """
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _pool_slots = None
+            logger.info("Database connection pool closed.")
+
+
+# Queries that take longer than this many milliseconds are logged as warnings
+SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', '200'))
+
+# Counter of the queries run in the current context (e.g. one API request), set by start_query_count. It holds a
+# one-element list so increments made in worker threads, which run in a copy of the context, are seen by the caller.
+_query_count = contextvars.ContextVar('query_count', default=None)
+
+
+def start_query_count():
+    """
+    Starts counting the queries executed by execute_query and stream_query in the current context.
+
+    :return: A one-element list whose only item is the number of queries executed so far.
+    """
+    counter = [0]
+    _query_count.set(counter)
+    return counter
+
+
+def _count_query():
+    """
+    Adds one to the query counter of the current context, if one has been started.
+    """
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+# Statements prepared on each pooled connection, keyed by the SQL text. Entries disappear with their connection.
+# The crud queries only produce a few dozen distinct statements, so by default every one of them stays prepared.
+PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv('DB_PREPARED_STATEMENT_CACHE_SIZE', '100'))
+_prepared_statements = weakref.WeakKeyDictionary()
+_prepared_statements_lock = threading.Lock()
+_statement_ids = itertools.count()
+
+
+def _prepare_statement(connection, cursor, query):
+    """
+    Returns the name of a server-side prepared statement for the query on the given connection.
+
+    The statement is prepared the first time a connection runs the query and reused afterwards, so PostgreSQL parses
+    and plans it once per connection instead of on every call. The least recently used statement is deallocated once
+    a connection holds PREPARED_STATEMENT_CACHE_SIZE of them.
+
+    :param connection: The database connection object the statement belongs to.
+    :param cursor: An open cursor of the connection.
+    :param query: The SQL query string, using %s placeholders.
+    :return: The name of the prepared statement.
+    """
+    with _prepared_statements_lock:
+        statements = _prepared_statements.setdefault(connection, OrderedDict())
+
+    statement_name = statements.get(query)
+    if statement_name is not None:
+        statements.move_to_end(query)
+        return statement_name
+
+    statement_name = f"fresco_stmt_{next(_statement_ids)}"
+    placeholder_numbers = itertools.count(1)
+    prepared_query = re.sub(r"%s", lambda match: f"${next(placeholder_numbers)}", query)
+    cursor.execute(f"PREPARE {statement_name} AS {prepared_query}")
+    statements[query] = statement_name
+
+    if len(statements) > PREPARED_STATEMENT_CACHE_SIZE:
+        _, evicted_name = statements.popitem(last=False)
+        cursor.execute(f"DEALLOCATE {evicted_name}")
+    return statement_name
+
+
 def execute_query(connection, query, params=None):
     """
     Executes a SQL query on the given database connection.
 
     This function uses the provided database connection to execute a SQL query.
     It is designed to handle SELECT queries that return data. The function
-    attempts to execute the given query and fetch all the results. If an error
-    occurs during query execution, it logs the error and raises the exception.
+    attempts to execute the given query and fetch all the results. Parameterized
+    queries run as server-side prepared statements that are cached per connection.
+    Queries slower than SLOW_QUERY_MS milliseconds are logged as warnings.
+    If an error occurs during query execution, it logs the error and raises the exception.
 
     :param connection: The database connection object to use for executing the query.
     :param query: The SQL query string to be executed.
@@ -66,17 +209,85 @@ def execute_query(connection, query, params=None):
     try:
         with connection.cursor() as cursor:
             # Log the start of the query execution
-            logger.debug(f"Executing query: {query[:50]}...")  # Log only the first 50 characters of the query
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executing query: %s...", query[:50])  # Log only the first 50 characters of the query
 
-            cursor.execute(query, params)
+            _count_query()
+            started = time.perf_counter()
+            if params is None:
+                cursor.execute(query, params)
+            else:
+                statement_name = _prepare_statement(connection, cursor, query)
+                cursor.execute(f"EXECUTE {statement_name} ({', '.join(['%s'] * len(params))})", params)
 
             # Fetch and return the results
             results = cursor.fetchall()
-            logger.info(f"Query executed successfully. Number of records fetched: {len(results)}")
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms > SLOW_QUERY_MS:
+                logger.warning("Slow query (%.0f ms): %s...", elapsed_ms, query[:50])
+            logger.debug("Query executed successfully. Number of records fetched: %s", len(results))
             return results
     except Exception as error:
+        # Forget the statement so the next call prepares it again
+        with _prepared_statements_lock:
+            statement_name = _prepared_statements.get(connection, {}).pop(query, None)
         # Log the error without revealing sensitive query details
-        logger.error(f"Error executing query: {error}")
+        logger.error("Error executing query: %s", error)
+        if statement_name is not None:
+            _deallocate_statement(connection, statement_name)
+        raise
+
+
+def _deallocate_statement(connection, statement_name):
+    """
+    Deallocates a prepared statement that execute_query stopped tracking after a failed execution.
+
+    Prepared statements survive a rollback, so without this every failure would leave one unused statement behind on
+    the pooled connection. The failed transaction is rolled back first, since PostgreSQL rejects any further command in
+    it. If the connection itself is broken, the statement goes away with it and the error is only logged.
+
+    :param connection: The database connection object the statement belongs to.
+    :param statement_name: The name of the prepared statement.
+    """
+    try:
+        connection.rollback()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DEALLOCATE {statement_name}")
+    except Exception as error:
+        logger.warning("Failed to deallocate prepared statement %s: %s", statement_name, error)
+
+
+def stream_query(connection, query, params=None, batch_size=1000):
+    """
+    Executes a SQL query on the given database connection and yields the results row by row.
+
+    Unlike execute_query, this function does not materialize the whole result set. It opens a named
+    (server-side) cursor so PostgreSQL keeps the result on the server and psycopg2 transfers it in
+    batches of `batch_size` rows. Memory usage is therefore bounded by the batch size instead of the
+    number of rows, which makes it suitable for large exports.
+
+    :param connection: The database connection object to use for executing the query.
+    :param query: The SQL query string to be executed.
+    :param params: Optional parameters to be passed with the query. Defaults to None.
+    :param batch_size: The number of rows fetched from the server per network round-trip. Defaults to 1000.
+    :yield: One tuple per database record.
+    """
+    try:
+        with connection.cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = batch_size
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Streaming query: %s...", query[:50])  # Log only the first 50 characters of the query
+            _count_query()
+            cursor.execute(query, params)
+
+            record_count = 0
+            for record in cursor:
+                record_count += 1
+                yield record
+            logger.debug("Query streamed successfully. Number of records fetched: %s", record_count)
+    except Exception as error:
+        logger.error("Error streaming query: %s", error)
         raise
 
 
@@ -84,91 +295,160 @@ def convert_to_model(data, conversion_function):
     """
     Convert query results (list of tuples) into model instances using a provided conversion function.
 
-    :param data: List of tuples, each representing a database record.
+    A list, as returned by execute_query, is converted in place: each tuple is replaced by its model instance and can
+    be freed straight away, so no second list of the same size is allocated. Any other iterable, such as the generator
+    returned by stream_query, is converted lazily and a generator of model instances is returned, keeping memory usage
+    constant regardless of the number of records.
+
+    For record_to_host_data and record_to_job_data the record length is validated once on the first record, since all
+    records of a result set have the same columns, and the remaining records are built without per-record checks.
+
+    :param data: List (or iterable) of tuples, each representing a database record.
     :param conversion_function: A function that takes a tuple and returns a model instance.
-    :return: List of model instances.
+    :return: List of model instances, or a generator of model instances if data is not a list.
     """
+    if not isinstance(data, list):
+        logger.debug("Converting streamed query results to model instances.")
+        return _convert_lazily(data, conversion_function)
+
     try:
-        logger.info("Starting conversion of query results to model instances.")
-        converted_data = [conversion_function(record) for record in data]
-        logger.info(f"Conversion successful. Number of records converted: {len(converted_data)}")
+        logger.debug("Starting conversion of query results to model instances.")
+        if data:
+            conversion_function = _validated_converter(conversion_function, data[0])
+        for index, record in enumerate(data):
+            data[index] = conversion_function(record)
+        logger.debug("Conversion successful. Number of records converted: %s", len(data))
+        return data
+    except Exception as error:
+        logger.error("Error during conversion: %s", error)
+        raise
+
+
+def _convert_lazily(data, conversion_function):
+    """
+    Yield a model instance for each record of an iterable of query results.
+
+    :param data: Iterable of tuples, each representing a database record.
+    :param conversion_function: A function that takes a tuple and returns a model instance.
+    :yield: One model instance per record.
+    """
+    try:
+        records = iter(data)
+        first_record = next(records, None)
+        if first_record is None:
+            return
+
+        conversion_function = _validated_converter(conversion_function, first_record)
+        yield conversion_function(first_record)
+        for record in records:
+            yield conversion_function(record)
+    except Exception as error:
+        logger.error("Error during conversion: %s", error)
+        raise
+
+
+def _validated_converter(conversion_function, first_record):
+    """
+    Validate the first record of a result set once and return the converter to use for all of its records.
+
+    For the known record converters this checks the record length up front and returns the NamedTuple's `_make`,
+    which builds each record without repeating the check. Any other conversion function is returned unchanged.
+
+    :param conversion_function: A function that takes a tuple and returns a model instance.
+    :param first_record: The first record of the result set.
+    :return: A function that takes a tuple and returns a model instance.
+    """
+    record_type = _RECORD_TYPES.get(conversion_function)
+    if record_type is None:
+        return conversion_function
+
+    if len(first_record) != len(record_type._fields):
+        raise ValueError(f"Invalid record length. Expected {len(record_type._fields)} elements.")
+    return record_type._make
+
+
+def convert_to_columns(data, fields):
+    """
+    Transpose query results (list of tuples) into a column-oriented dictionary.
+
+    Analytics consumers usually load results into a DataFrame, which is column-oriented. Handing them one list per
+    column skips building a Python object per row and can be passed straight to e.g. `pandas.DataFrame(columns)`.
+
+    :param data: List of tuples, each representing a database record.
+    :param fields: The column names, in the order of the values in each tuple.
+    :return: A dictionary mapping each column name to the list of its values.
+    """
+    try:
+        logger.debug("Starting conversion of query results to columns.")
+        if data and len(data[0]) != len(fields):
+            raise ValueError(f"Invalid record length. Expected {len(fields)} elements.")
+
+        columns = zip(*data) if data else [()] * len(fields)
+        converted_data = {field: list(values) for field, values in zip(fields, columns)}
+        logger.debug("Conversion successful. Number of records converted: %s", len(data))
         return converted_data
     except Exception as error:
-        logger.error(f"Error during conversion: {error}")
+        logger.error("Error during conversion to columns: %s", error)
         raise
 
 
 def record_to_host_data(record):
     """
-    Converts a database record tuple into a HostData model instance.
+    Converts a database record tuple into a HostDataRecord instance.
 
     This function takes a tuple representing a single record from the 'host_data'
-    table and maps its elements to the corresponding fields of the HostData model.
-    The resulting object is an instance of the HostData model, ready for use in
-    the application.
+    table and maps its elements, in column order, to the fields of the HostDataRecord
+    named tuple. The resulting object is a lightweight read-only record, ready for
+    serialization by the API.
 
     :param record: A tuple containing the fields of a single 'host_data' record.
-    :return: An instance of the HostData model populated with data from the record.
+    :return: A HostDataRecord populated with data from the record.
     """
     try:
-        # model_fields = inspect.signature(models.HostData).parameters  # not working
         expected_length = 9
 
         if len(record) != expected_length:
             raise ValueError(f"Invalid record length. Expected {expected_length} elements.")
 
-        host_data_instance = models.HostData(
-            time=record[0], host=record[1], jid=record[2], type=record[3],
-            event=record[4], unit=record[5], value=record[6], diff=record[7], arc=record[8]
-        )
-        logger.debug("Successfully converted database record to HostData model instance.")
+        # The record columns are in the field order of HostDataRecord, so they are unpacked positionally
+        host_data_instance = models.HostDataRecord._make(record)
+        logger.debug("Successfully converted database record to HostDataRecord.")
         return host_data_instance
     except Exception as error:
-        logger.error(f"Error in converting record to HostData model: {error}")
+        logger.error("Error in converting record to HostDataRecord: %s", error)
         raise
 
 
 def record_to_job_data(record):
     """
-    Converts a database record tuple into a JobData model instance.
+    Converts a database record tuple into a JobDataRecord instance.
 
     This function takes a tuple representing a single record from the 'job_data'
-    table and maps its elements to the corresponding fields of the JobData model.
-    The resulting object is an instance of the JobData model, encapsulating all
-    the job-related data in a structured format, suitable for use throughout the
-    application.
+    table and maps its elements, in column order, to the fields of the JobDataRecord
+    named tuple. The resulting object is a lightweight read-only record that
+    encapsulates all the job-related data in a structured format, suitable for
+    serialization by the API.
 
     :param record: A tuple containing the fields of a single 'job_data' record.
-    :return: An instance of the JobData model populated with data from the record.
+    :return: A JobDataRecord populated with data from the record.
     """
     try:
-        # model_fields = inspect.signature(models.HostData).parameters  # not working
         expected_length = 17
 
         if len(record) != expected_length:
             raise ValueError(f"Invalid record length. Expected {expected_length} elements.")
 
-        job_data_instance = models.JobData(
-            jid=record[0],
-            submit_time=record[1],
-            start_time=record[2],
-            end_time=record[3],
-            runtime=record[4],
-            timelimit=record[5],
-            node_hrs=record[6],
-            nhosts=record[7],
-            ncores=record[8],
-            ngpus=record[9],
-            username=record[10],
-            account=record[11],
-            queue=record[12],
-            state=record[13],
-            jobname=record[14],
-            exitcode=record[15],
-            host_list=record[16]
-        )
-        logger.debug("Successfully converted database record to JobData model instance.")
+        # The record columns are in the field order of JobDataRecord, so they are unpacked positionally
+        job_data_instance = models.JobDataRecord._make(record)
+        logger.debug("Successfully converted database record to JobDataRecord.")
         return job_data_instance
     except Exception as error:
-        logger.error(f"Error in converting record to JobData model: {error}")
+        logger.error("Error in converting record to JobDataRecord: %s", error)
         raise
+
+
+# Record types built by the converters above; convert_to_model uses them to validate a result set once
+_RECORD_TYPES = {
+    record_to_host_data: models.HostDataRecord,
+    record_to_job_data: models.JobDataRecord,
+}
@@ -1,371 +1,632 @@
-from typing import List, Tuple
-from fastapi import FastAPI, Depends, HTTPException, status
-from datetime import timedelta
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
+from datetime import datetime, timedelta
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 import crud
+import database_helpers as dbm
 import models
 import schemas
 import security
 from models import host_and_data_table_engine
 from fastapi.security import OAuth2PasswordRequestForm
+import anyio
+import base64
+import hashlib
+import inspect
+import itertools
 import logging
+import logging.handlers
+import orjson
+import os
+import queue
+import time
 # import uvicorn
 
 
-# Configure logging
+# Configure logging. Per-request details are logged at DEBUG; set LOG_LEVEL=DEBUG to see them.
 logging.basicConfig(level=logging.INFO)
+logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
+log_listener = None
 
-models.Base.metadata.create_all(bind=host_and_data_table_engine)
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 ROW_LIMIT = 300
+# The endpoints are synchronous and run in AnyIO's worker threads; this bounds how many requests query concurrently
+THREADPOOL_SIZE = int(os.getenv("API_THREADPOOL_SIZE", "40"))
+# Password verification is CPU-bound; it is limited to one verification per CPU so a login burst cannot occupy the
+# worker threads the data endpoints need. Created at startup, since AnyIO limiters need a running event loop.
+password_limiter = None
+# Per-request profiling for diagnosing latency; the middleware is only installed when enabled, so it costs nothing
+# otherwise
+API_PROFILING = os.getenv("API_PROFILING") == "1"
+# Schema management is a deployment step (`python3 models.py`); workers only create tables when asked to, e.g. in dev
+AUTO_CREATE_TABLES = os.getenv("AUTO_CREATE_TABLES") == "1"
+# Compress JSON responses of at least GZIP_MINIMUM_SIZE bytes for clients that accept gzip; a page of job data
+# shrinks several times over, while small responses are not worth the CPU
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "5"))
+# Records serialized per chunk of a streamed export; StreamingResponse moves every chunk of a sync iterator through a
+# worker thread, so one chunk per record would cost a thread hop per record
+STREAM_BATCH_SIZE = 500
+
+
+@app.middleware("http")
+async def answer_not_modified(request: Request, call_next):
+    """
+    Answer a conditional GET with 304 Not Modified when the client already holds the current page.
 
+    Pages of job and host data carry an ETag computed from their body (see set_etag). Dashboards polling the same URL
+    send it back in If-None-Match, and when it still matches the body is dropped and only the headers are returned,
+    so nothing is transferred or parsed again on the client.
 
-# -------------- helpers -------------------------------------------------------------
+    :param: request (Request): The incoming request.
+    :param: call_next: The next handler in the middleware chain.
 
-def get_db_host_job_tables():
+    :return: Response: An empty 304 response if the client's ETag matches, otherwise the endpoint's response.
     """
-    Provides a database session for a single request, and closes it afterward.
+    if_none_match = request.headers.get("If-None-Match")
+    response = await call_next(request)
+    etag = response.headers.get("ETag")
+    if if_none_match is None or etag is None or response.status_code != 200:
+        return response
 
-    Yields a SQLAlchemy SessionLocal instance that is used for database operations. The session is
-    closed once the request is complete.
+    client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" not in client_etags and etag.removeprefix("W/") not in client_etags:
+        return response
 
-    :yield: A SQLAlchemy SessionLocal instance for database operations.
-    :raises HTTPException: If an error occurs during session creation or closure.
+    headers = {name: value for name, value in response.headers.items()
+               if name not in ("content-length", "content-type", "content-encoding")}
+    return Response(status_code=304, headers=headers)
+
+
+@app.middleware("http")
+async def time_request(request: Request, call_next):
     """
-    db = models.SessionLocalHostJob()
-    try:
-        logger.info("get_db_host_job_tables returning database session")
-        yield db
-    except Exception as e:
-        logger.error("Error in get_db_host_job_tables: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+    Measure how long a request takes and how many database queries it runs.
 
+    Both are returned in the X-Process-Time-Ms and X-Query-Count response headers and logged, so every endpoint's
+    latency and query budget can be tracked and regressions spotted. For streamed responses the numbers cover the
+    time until the response starts.
 
-def get_db_api_user():
+    :param: request (Request): The incoming request.
+    :param: call_next: The next handler in the middleware chain.
+
+    :return: Response: The endpoint's response with the timing headers added.
     """
-    Create and manage a database session for API user models.
+    started = time.perf_counter()
+    query_count = dbm.start_query_count()
+    response = await call_next(request)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    response.headers["X-Process-Time-Ms"] = f"{elapsed_ms:.1f}"
+    response.headers["X-Query-Count"] = str(query_count[0])
+    logger.info("%s %s returned %s in %.1f ms with %s queries", request.method, request.url.path,
+                response.status_code, elapsed_ms, query_count[0])
+    return response
+
+
+if API_PROFILING:
+    from pyinstrument import Profiler
+
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        """
+        Profile a request with pyinstrument when it carries the `profile=1` query parameter.
+
+        The profile shows whether the time goes to the database, the record conversion or the serialization, and is
+        returned as an HTML report instead of the endpoint's response. Requests without the parameter pass through.
 
-    This function initializes a database session using the `SessionLocalApiUser` method from the `models` module,
-    specifically for interactions with the API user data models. It is designed to be used as a context manager,
-    ensuring that the database session is properly opened and closed. The function yields the database session to
-    the caller and ensures that the session is closed properly, regardless of whether an exception occurs or not.
+        :param: request (Request): The incoming request.
+        :param: call_next: The next handler in the middleware chain.
 
-    Yields:
-    :yield: Session: The SQLAlchemy Session object for API user database transactions.
+        :return: Response: The HTML profile report, or the endpoint's response if profiling was not requested or the
+                 request failed, e.g. because it was not authenticated.
+        """
+        if request.query_params.get("profile") != "1":
+            return await call_next(request)
 
-    Usage example:
-    # Using the function with a 'with' statement
-    with get_db_api_user() as db:
-        # Perform database operations using 'db'
-        pass
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        response = await call_next(request)
+        # Drain the body so serialization and streamed records are part of the profile
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        profiler.stop()
+
+        # Only requests the endpoint accepted are profiled; a 401 must not be turned into a report
+        if response.status_code >= 400:
+            return Response(body, status_code=response.status_code, headers=dict(response.headers))
+        return HTMLResponse(profiler.output_html())
+
+
+# Registered last so it wraps the other middleware: responses answered with 304 are never compressed
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+
+
+@app.exception_handler(Exception)
+async def handle_unexpected_error(request: Request, exc: Exception):
     """
-    db = models.SessionLocalApiUser()
-    try:
-        yield db
-    finally:
-        db.close()
+    Answer any error an endpoint did not handle with a generic 500 response.
 
+    The endpoints only raise HTTPException for the errors they expect, and everything else ends up here instead of in
+    a try/except in every endpoint. The error is logged with the request it occurred in, while the client only gets a
+    generic message so database errors and internals are not leaked. The server logs the traceback.
 
-def get_db_and_user(db: Session = Depends(get_db_host_job_tables),
-                    current_user: models.ApiUser = Depends(security.get_current_active_user)):
+    :param: request (Request): The request that failed.
+    :param: exc (Exception): The unhandled error.
+
+    :return: ORJSONResponse: A 500 response with a generic detail message.
     """
-    Retrieve the database session and the current authenticated user.
+    logger.error("Unexpected error in %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse({"detail": "Internal server error"}, status_code=500)
 
-    :param: db (Session): A dependency that provides access to the database session.
-    :param: current_user (models.ApiUser): A dependency that provides the current authenticated user.
 
-    :return: Tuple[Session, models.ApiUser]: A tuple containing the database session and the current authenticated user.
-    :raises HTTPException: If there is an error in fetching the database session or the current user.
+@app.on_event("startup")
+def create_tables():
     """
-    try:
-        logger.info("get_db_and_user returning database session and user")
-        return db, current_user
-    except Exception as e:
-        logger.error("Error in get_db_and_user: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    Create any missing tables and indexes when AUTO_CREATE_TABLES=1.
 
+    Checking the schema costs a database round-trip per table, so workers skip it by default and start without
+    touching the database; the schema is created once per deployment by running `python3 models.py`.
+    """
+    if AUTO_CREATE_TABLES:
+        models.Base.metadata.create_all(bind=host_and_data_table_engine)
+        logger.info("Database tables created.")
 
-# -------------- authorization endpoint -------------------------------------------------------------
 
-@app.post("/token", response_model=security.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db_api_user)):
+@app.on_event("startup")
+def configure_threadpool():
     """
-    Authenticate a user and return an access token.
+    Size the worker thread pool used for the synchronous endpoints.
 
-    :param: form_data (OAuth2PasswordRequestForm): The form data containing the username and password.
-    :param: db (Session): A database session dependency.
+    The psycopg2 queries block, so FastAPI runs each endpoint in a worker thread instead of on the event loop. The
+    number of worker threads therefore caps how many requests can wait on the database at once.
+    """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    logger.info("Worker thread pool size set to %s", THREADPOOL_SIZE)
 
-    :return: security.Token: A token response model containing the access token and token type.
-    :raises HTTPException: If the username is not found or the password is incorrect.
+
+@app.on_event("startup")
+def prepare_password_hashing():
     """
-    try:
-        logger.info("Attempting user authentication for username: %s", form_data.username)
-        user = security.get_user(db, username=form_data.username)
-
-        if not user:
-            logger.warning("User not found: %s", form_data.username)
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect username or password",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        if not security.verify_password(form_data.password, user.password_hash):
-            logger.warning("Password verification failed for user: %s", form_data.username)
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect username or password",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = security.create_access_token(
-            data={"sub": user.username}, expires_delta=access_token_expires
-        )
-        logger.info("Authentication successful, token generated for user: %s", form_data.username)
-        return {"access_token": access_token, "token_type": "bearer"}
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        logger.error("Unexpected error in login: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    Create the password verification limiter.
+    """
+    global password_limiter
+    password_limiter = anyio.CapacityLimiter(os.cpu_count() or 1)
+    logger.info("Password verification limited to %s concurrent checks", password_limiter.total_tokens)
 
 
-# -------------- job data endpoints -------------------------------------------------------------
+@app.on_event("startup")
+def configure_logging():
+    """
+    Hand log records to a background thread instead of writing them in the thread that logs them.
+
+    The root logger's handlers are moved behind a QueueHandler and a QueueListener, so a request never waits on a slow
+    stdout/stderr pipe; it only puts the record on a queue.
+    """
+    global log_listener
+    root_logger = logging.getLogger()
+    log_queue = queue.SimpleQueue()
+    log_listener = logging.handlers.QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    log_listener.start()
 
 
-@app.get("/job_data_job_id/{job_id}", response_model=List[schemas.JobData])
-def read_job_data_single_jid(job_id: str, db_user: Tuple[Session, models.ApiUser] = Depends(get_db_and_user)):
+@app.on_event("shutdown")
+def flush_logs():
     """
-    Fetch all job data records associated with a given job ID.
+    Write out the queued log records and restore the root logger's handlers when the application stops.
+    """
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        logging.getLogger().handlers = list(log_listener.handlers)
+        log_listener = None
 
-    :param: job_id (str): The job identifier used to filter the job data records.
-    :param: db_user (Tuple[Session,
-    models.ApiUser]): A tuple containing the database session and the current authenticated user.
 
-    :return: List[schemas.JobData]: A list of JobData records where the job_id matches the specified value.
-    :raises HTTPException: If no records are found or if there is a database error.
+@app.on_event("shutdown")
+def close_database_connections():
     """
-    db, current_user = db_user
+    Close the pooled database connections used by the crud functions when the application stops.
+    """
+    dbm.close_connection_pool()
+
+
+# -------------- helpers -------------------------------------------------------------
+
+async def get_db_host_job_tables():
+    """
+    Provides a database session for a single request, and closes it afterward.
+
+    Yields a SQLAlchemy SessionLocal instance that is used for database operations. The session is
+    closed once the request is complete. Creating and closing a session that has not been used does no I/O, so this
+    runs on the event loop rather than taking a worker thread for every request.
+
+    :yield: A SQLAlchemy SessionLocal instance for database operations.
+    """
+    db = models.SessionLocalHostJob()
     try:
-        logger.info("Fetching job data for job ID: %s", job_id)
-        db_items = crud.get_job_data_by_id(job_data_id=job_id, row_limit=ROW_LIMIT)
+        logger.debug("get_db_host_job_tables returning database session")
+        yield db
+    finally:
+        db.close()
 
-        if db_items is None:
-            logger.error("Failed to establish database connection.")
-            raise HTTPException(status_code=500, detail="Internal server error")
 
-        if not db_items:
-            logger.warning("No job data found for job ID: %s", job_id)
-            raise HTTPException(status_code=404, detail=f"Job ID {job_id} not found")
+# The login endpoint and security.get_current_user share one dependency callable, so FastAPI's per-request
+# dependency cache resolves it once and tests can override both with a single dependency_overrides entry
+get_db_api_user = security.get_db_api_user
 
-        logger.info("Successfully retrieved job data for job ID: %s", job_id)
-        return db_items
-    except Exception as e:
-        logger.error("Unexpected error while fetching job data for job ID %s: %s", job_id, str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+
+@dataclass(frozen=True, slots=True)
+class DbUser:
+    """
+    The database session and the authenticated user of a request, as provided by get_db_and_user.
+    """
+    db: Session
+    user: models.ApiUserRecord
 
 
-@app.get("/job_data_user_id/{user_id}", response_model=List[schemas.JobData])
-def read_job_data_single_user(user_id: str, db_user: Tuple[Session, models.ApiUser] = Depends(get_db_and_user)):
+async def get_db_and_user(db: Session = Depends(get_db_host_job_tables),
+                          current_user: models.ApiUserRecord = Depends(security.get_current_active_user)) -> DbUser:
     """
-    Fetch all job data records associated with a given user ID.
+    Retrieve the database session and the current authenticated user.
 
-    :param: user_id (str): The user identifier used to filter the job data records.
-    :param: db_user (Tuple[Session,
-    models.ApiUser]): A tuple containing the database session and the current authenticated user.
+    This dependency does no I/O, so it is declared async and runs on the event loop instead of taking a worker
+    thread away from the endpoints for every request.
 
-    :return: List[schemas.JobData]: A list of JobData records where the user_id matches the specified value.
-    :raises HTTPException: If no records are found or if there is a database error.
+    :param: db (Session): A dependency that provides access to the database session.
+    :param: current_user (models.ApiUserRecord): A dependency that provides the current authenticated user.
+
+    :return: DbUser: The database session and the current authenticated user.
     """
-    db, current_user = db_user
-    try:
-        logger.info("Fetching job data for user ID: %s", user_id)
-        db_items = crud.get_job_data_by_user(user_id=user_id, row_limit=ROW_LIMIT)
+    logger.debug("get_db_and_user returning database session and user")
+    return DbUser(db, current_user)
 
-        if not db_items:
-            logger.warning("No job data found for user ID: %s", user_id)
-            raise HTTPException(status_code=404, detail=f"User ID {user_id} not found")
 
-        logger.info("Successfully retrieved job data for user ID: %s", user_id)
-        return db_items
+def encode_cursor(record, keyset: tuple) -> str:
+    """
+    Encode the keyset values of a record into an opaque pagination cursor.
+
+    :param: record: The last record of a page.
+    :param: keyset (tuple): The columns that uniquely order the records, e.g. crud.JOB_DATA_KEYSET.
 
-    except Exception as e:
-        logger.error("Unexpected error while fetching job data for user ID %s: %s", user_id, str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    :return: str: A URL-safe cursor to pass back in the `after` query parameter.
+    """
+    return base64.urlsafe_b64encode(orjson.dumps([getattr(record, column) for column in keyset])).decode()
 
 
-@app.get("/job_data_job_name/{job_name}", response_model=List[schemas.JobData])
-def read_job_data_single_job_name(job_name: str, db_user: Tuple[Session, models.ApiUser] = Depends(get_db_and_user)):
+def decode_cursor(cursor: str, keyset: tuple) -> tuple:
     """
-    Fetch all job data records associated with a given job name.
+    Decode a pagination cursor created by encode_cursor.
 
-    :param: job_name (str): The job name used to filter the job data records.
-    :param: db_user (Tuple[Session,
-    models.ApiUser]): A tuple containing the database session and the current authenticated user.
+    :param: cursor (str): The cursor from the `after` query parameter.
+    :param: keyset (tuple): The columns that uniquely order the records; the first one is a timestamp.
 
-    :return: List[schemas.JobData]: A list of JobData records where the job_name matches the specified value.
-    :raises HTTPException: If no records are found or if there is a database error.
+    :return: tuple: The keyset values of the last record of the previous page.
+    :raises HTTPException: If the cursor is malformed.
     """
-    db, current_user = db_user
     try:
-        logger.info("Fetching job data for job name: %s", job_name)
-        db_items = crud.get_job_data_by_job_name(job_name=job_name, row_limit=ROW_LIMIT)
+        values = orjson.loads(base64.urlsafe_b64decode(cursor))
+        if not isinstance(values, list) or len(values) != len(keyset):
+            raise ValueError("unexpected number of values")
+        values[0] = datetime.fromisoformat(values[0])
+        return tuple(values)
+    except (ValueError, TypeError) as e:
+        logger.warning("Invalid pagination cursor %s: %s", cursor, e)
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
 
-        if not db_items:
-            logger.warning("No job data found for job name: %s", job_name)
-            raise HTTPException(status_code=404, detail=f"Job name {job_name} not found")
 
-        logger.info("Successfully retrieved job data for job name: %s", job_name)
-        return db_items
-    except Exception as e:
-        logger.error("Unexpected error while fetching job data for job name %s: %s", job_name, str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+def set_etag(response: Response) -> Response:
+    """
+    Tag a rendered response with a weak ETag derived from its body, for answer_not_modified.
 
+    The ETag is weak because the GZip middleware may still change the encoding of the body.
 
-@app.get("/job_data_host_id/{host_id}", response_model=List[schemas.JobData])
-def read_job_data_single_host(host_id: str, db_user: Tuple[Session, models.ApiUser] = Depends(get_db_and_user)):
+    :param: response (Response): A response whose body has been rendered.
+
+    :return: Response: The same response with the ETag header set.
     """
-    Fetch all job data records associated with a given host ID.
+    response.headers["ETag"] = f'W/"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+    return response
 
-    :param: host_id (str): The host identifier used to filter the job data records.
-    :param: db_user (Tuple[Session,
-    models.ApiUser]): A tuple containing the database session and the current authenticated user.
 
-    :return: List[schemas.JobData]: A list of JobData records where the host_id is present in the job's host list.
-    :raises HTTPException: If no records are found or if there is a database error.
+def limit_page(db_items: list, limit: int = ROW_LIMIT, keyset: Optional[tuple] = None) -> ORJSONResponse:
     """
-    db, current_user = db_user
-    try:
-        logger.info("Fetching job data for host ID: %s", host_id)
-        db_items = crud.get_job_data_by_host_id(host_id=host_id, row_limit=ROW_LIMIT)
+    Trim a result set fetched with one extra row to the page size, serialize it and report whether more records exist.
 
-        if not db_items:
-            logger.warning("No job data found for host ID: %s", host_id)
-            raise HTTPException(status_code=404, detail=f"Host ID {host_id} not found")
+    The endpoints ask crud for limit + 1 records; the extra record only signals that the result was cut off, which
+    is returned to the client in the X-Has-More header instead of running a separate COUNT query. When records are
+    cut off and a keyset is given, the X-Next-Cursor header holds the cursor of the next page.
 
-        logger.info("Successfully retrieved job data for host ID: %s", host_id)
-        return db_items
-    except Exception as e:
-        logger.error("Unexpected error while fetching job data for host ID %s: %s", host_id, str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    The records are already typed rows built by crud, so they are turned into dicts and rendered with orjson directly
+    rather than being validated again through the endpoint's response_model, which is kept for the OpenAPI schema
+    only.
 
+    :param: db_items (list): The records fetched with a row limit of limit + 1.
+    :param: limit (int): The page size. Defaults to ROW_LIMIT.
+    :param: keyset (Optional[tuple]): The columns that uniquely order the records, used to build the next cursor.
 
-@app.get("/job_data_account_id/{account_id}", response_model=List[schemas.JobData])
-def read_job_data_single_account(account_id: str, db_user: Tuple[Session, models.ApiUser] = Depends(get_db_and_user)):
+    :return: ORJSONResponse: A JSON response with at most limit records, the pagination headers and an ETag.
     """
-    Fetch all job data records associated with a given account ID.
+    page = db_items[:limit]
+    headers = {"X-Has-More": "true" if len(db_items) > limit else "false"}
+    if len(db_items) > limit and keyset is not None:
+        headers["X-Next-Cursor"] = encode_cursor(page[-1], keyset)
+    return set_etag(ORJSONResponse([record._asdict() for record in page], headers=headers))
 
-    :param: account_id (str): The account identifier used to filter the job data records.
-    :param: db_user (Tuple[
-    Session, models.ApiUser]): A tuple containing the database session and the current authenticated user.
 
-    :return: List[schemas.JobData]: A list of JobData records where the account_id matches the specified value.
-    :raises HTTPException: If no records are found or if there is a database error.
+def stream_records(records: Iterator, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[bytes]:
     """
-    db, current_user = db_user
-    try:
-        logger.info("Fetching job data for account ID: %s", account_id)
-        db_items = crud.get_job_data_by_account(account_id=account_id, row_limit=ROW_LIMIT)
+    Serialize records into a JSON array batch_size records at a time, for use with a StreamingResponse.
+
+    :param: records (Iterator): The records to serialize, e.g. a generator returned by a crud stream function.
+    :param: batch_size (int): The number of records serialized into each chunk. Defaults to STREAM_BATCH_SIZE.
+
+    :yield: bytes: Chunks of the JSON array; the first chunk opens the array and the last one closes it.
+    """
+    prefix = b"["
+    for batch in iter(lambda: list(itertools.islice(records, batch_size)), []):
+        # Dump the batch as one array and strip its brackets, so the records are joined by orjson itself
+        yield prefix + orjson.dumps([record._asdict() for record in batch])[1:-1]
+        prefix = b","
+    yield b"[]" if prefix == b"[" else b"]"
+
+
+def make_lookup_endpoint(name: str, parameter: str, getter_name: str, keyset: tuple, record_kind: str,
+                         key_description: str, not_found_detail: str, hosts_option: bool = False):
+    """
+    Build the endpoint function for a single-key job or host data lookup.
+
+    The single-key endpoints differ only in their path parameter, the crud getter they call and their messages, so
+    they share this one implementation. The getter is looked up on the crud module for every request, which keeps it
+    patchable in tests.
+
+    Results are paged with keyset pagination: a page holds at most `limit` records, and when more exist the
+    X-Next-Cursor response header holds the cursor to pass as `after` for the next page. Every page costs a single
+    index seek, however deep it is.
+
+    :param: name (str): The name of the endpoint function, also used as the route name.
+    :param: parameter (str): The name of the path parameter holding the lookup key.
+    :param: getter_name (str): The name of the crud getter taking the key, a row_limit and an after cursor.
+    :param: keyset (tuple): The columns the getter orders by, e.g. crud.JOB_DATA_KEYSET.
+    :param: record_kind (str): The kind of records returned, e.g. "job data", for log messages and the description.
+    :param: key_description (str): What the key is, e.g. "job ID", for log messages and the description.
+    :param: not_found_detail (str): The 404 detail, with a {} placeholder for the key.
+    :param: hosts_option (bool): Whether the endpoint takes an include_hosts query parameter, passed on to the
+            getter, so clients that do not need each job's host_list can skip reading and sending it.
+
+    :return: Callable: The endpoint function, taking the path parameter, the after and limit query parameters, the
+             db_user dependency and, with hosts_option, the include_hosts query parameter.
+    """
+    def endpoint(after: Optional[str], limit: int, db_user: DbUser, include_hosts: bool = True, **path_parameters):
+        value = path_parameters[parameter]
+        after_values = None if after is None else decode_cursor(after, keyset)
+        getter_options = {"include_hosts": include_hosts} if hosts_option else {}
+        logger.debug("Fetching %s for %s: %s", record_kind, key_description, value)
+        db_items = getattr(crud, getter_name)(value, row_limit=limit + 1, after=after_values, **getter_options)
+
+        if db_items is None:
+            logger.error("Failed to establish database connection.")
+            raise HTTPException(status_code=500, detail="Internal server error")
 
         if not db_items:
-            logger.warning("No job data found for account ID: %s", account_id)
-            raise HTTPException(status_code=404, detail=f"Account ID {account_id} not found")
+            logger.warning("No %s found for %s: %s", record_kind, key_description, value)
+            raise HTTPException(status_code=404, detail=not_found_detail.format(value))
+
+        logger.debug("Successfully retrieved %s for %s: %s", record_kind, key_description, value)
+        return limit_page(db_items, limit, keyset)
+
+    # FastAPI reads the path parameter and the dependency from the signature
+    parameters = [
+        inspect.Parameter(parameter, inspect.Parameter.KEYWORD_ONLY, annotation=str),
+        inspect.Parameter("after", inspect.Parameter.KEYWORD_ONLY, default=Query(None), annotation=Optional[str]),
+        inspect.Parameter("limit", inspect.Parameter.KEYWORD_ONLY, default=Query(ROW_LIMIT, ge=1, le=ROW_LIMIT),
+                          annotation=int),
+        inspect.Parameter("db_user", inspect.Parameter.KEYWORD_ONLY, default=Depends(get_db_and_user),
+                          annotation=DbUser),
+    ]
+    if hosts_option:
+        parameters.append(inspect.Parameter("include_hosts", inspect.Parameter.KEYWORD_ONLY, default=Query(True),
+                                            annotation=bool))
+    endpoint.__signature__ = inspect.Signature(parameters)
+    endpoint.__name__ = endpoint.__qualname__ = name
+    endpoint.__doc__ = (f"Fetch one page of at most `limit` {record_kind} records associated with a given "
+                        f"{key_description}; pass the X-Next-Cursor response header as `after` for the next page.")
+    return endpoint
 
-        logger.info("Successfully retrieved job data for account ID: %s", account_id)
-        return db_items
-    except Exception as e:
-        logger.error("Unexpected error while fetching job data for account ID %s: %s", account_id, str(e))
-        raise HTTPException(status_code=500, detail=str(e))
 
+# -------------- authorization endpoint -------------------------------------------------------------
 
-@app.get("/job_data_exit_code/{exit_code}", response_model=List[schemas.JobData])
-def read_job_data_single_exit_code(exit_code: str, db_user: Tuple[Session, models.ApiUser] = Depends(get_db_and_user)):
+@app.post("/token", response_model=security.Token)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db_api_user)):
     """
-    Fetch all job data records associated with a given exit code.
+    Authenticate a user and return an access token.
+
+    :param: form_data (OAuth2PasswordRequestForm): The form data containing the username and password.
+    :param: db (Session): A database session dependency.
 
-    :param: exit_code (str): The exit code used to filter the job data records.
-    :param: db_user (Tuple[Session,
-    models.ApiUser]): A tuple containing the database session and the current authenticated user.
+    The user lookup runs in a worker thread and the password check in a worker thread bounded by password_limiter, so
+    neither blocks the event loop.
 
-    :return: List[schemas.JobData]: A list of JobData records where the exit_code matches the specified value.
-    :raises HTTPException: If no records are found or if there is a database error.
+    :return: security.Token: A token response model containing the access token and token type.
+    :raises HTTPException: If the username is not found or the password is incorrect.
     """
-    db, current_user = db_user
-    try:
-        logger.info("Fetching job data for exit code: %s", exit_code)
-        db_items = crud.get_job_data_by_exit_code(exit_code=exit_code, row_limit=ROW_LIMIT)
+    logger.debug("Attempting user authentication for username: %s", form_data.username)
+    user = await anyio.to_thread.run_sync(security.get_user, db, form_data.username)
+
+    if not user:
+        logger.warning("User not found: %s", form_data.username)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
-        if not db_items:
-            logger.warning("No job data found for exit code: %s", exit_code)
-            raise HTTPException(status_code=404, detail=f"Exit code {exit_code} not found")
+    if not await anyio.to_thread.run_sync(security.verify_password, form_data.password, user.password_hash,
+                                          limiter=password_limiter):
+        logger.warning("Password verification failed for user: %s", form_data.username)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
-        logger.info("Successfully retrieved job data for exit code: %s", exit_code)
-        return db_items
-    except Exception as e:
-        logger.error("Unexpected error while fetching job data for exit code %s: %s", exit_code, str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    if security.password_hash_needs_update(user.password_hash):
+        # The password is correct, so a failed re-hash (e.g. an API role without UPDATE on api_user) must not cost the
+        # user their token; the old hash stays valid and the re-hash is retried on the next login
+        try:
+            await anyio.to_thread.run_sync(security.update_password_hash, db, user, form_data.password,
+                                           limiter=password_limiter)
+        except SQLAlchemyError as e:
+            await anyio.to_thread.run_sync(db.rollback)
+            logger.warning("Failed to update the password hash of user %s: %s", form_data.username, e)
+
+    access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = security.create_access_token(
+        data={"sub": user.username}, expires_delta=access_token_expires
+    )
+    logger.info("Authentication successful, token generated for user: %s", form_data.username)
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+# -------------- job data endpoints -------------------------------------------------------------
+
+read_job_data_single_jid = make_lookup_endpoint(
+    "read_job_data_single_jid", "job_id", "get_job_data_by_id", crud.JOB_DATA_KEYSET,
+    "job data", "job ID", "Job ID {} not found", hosts_option=True)
+read_job_data_single_user = make_lookup_endpoint(
+    "read_job_data_single_user", "user_id", "get_job_data_by_user", crud.JOB_DATA_KEYSET,
+    "job data", "user ID", "User ID {} not found", hosts_option=True)
+read_job_data_single_job_name = make_lookup_endpoint(
+    "read_job_data_single_job_name", "job_name", "get_job_data_by_job_name", crud.JOB_DATA_KEYSET,
+    "job data", "job name", "Job name {} not found", hosts_option=True)
+read_job_data_single_host = make_lookup_endpoint(
+    "read_job_data_single_host", "host_id", "get_job_data_by_host_id", crud.JOB_DATA_KEYSET,
+    "job data", "host ID", "Host ID {} not found", hosts_option=True)
+read_job_data_single_account = make_lookup_endpoint(
+    "read_job_data_single_account", "account_id", "get_job_data_by_account", crud.JOB_DATA_KEYSET,
+    "job data", "account ID", "Account ID {} not found", hosts_option=True)
+read_job_data_single_exit_code = make_lookup_endpoint(
+    "read_job_data_single_exit_code", "exit_code", "get_job_data_by_exit_code", crud.JOB_DATA_KEYSET,
+    "job data", "exit code", "Exit code {} not found", hosts_option=True)
+
+app.get("/job_data_job_id/{job_id}", response_model=List[schemas.JobData])(read_job_data_single_jid)
+app.get("/job_data_user_id/{user_id}", response_model=List[schemas.JobData])(read_job_data_single_user)
+app.get("/job_data_job_name/{job_name}", response_model=List[schemas.JobData])(read_job_data_single_job_name)
+app.get("/job_data_host_id/{host_id}", response_model=List[schemas.JobData])(read_job_data_single_host)
+app.get("/job_data_account_id/{account_id}", response_model=List[schemas.JobData])(read_job_data_single_account)
+app.get("/job_data_exit_code/{exit_code}", response_model=List[schemas.JobData])(read_job_data_single_exit_code)
 
 
 # -------------- host data endpoints -------------------------------------------------------------
 
-@app.get("/host_data_job_id/{job_data_id}", response_model=List[schemas.HostData])
-def read_host_data_single_jid(job_data_id: str, db_user: Tuple[Session, models.ApiUser] = Depends(get_db_and_user)):
+read_host_data_single_jid = make_lookup_endpoint(
+    "read_host_data_single_jid", "job_data_id", "get_host_data_by_job_id", crud.HOST_DATA_KEYSET,
+    "host data", "job data ID", "Host data for job ID {} not found")
+read_host_data_single_node = make_lookup_endpoint(
+    "read_host_data_single_node", "node_id", "get_host_data_by_host_id", crud.HOST_DATA_KEYSET,
+    "host data", "node ID", "Host data for node {} not found")
+
+app.get("/host_data_job_id/{job_data_id}", response_model=List[schemas.HostData])(read_host_data_single_jid)
+app.get("/host_data_node_id/{node_id}", response_model=List[schemas.HostData])(read_host_data_single_node)
+
+
+@app.get("/host_data_job_id/{job_data_id}/export", response_model=List[schemas.HostData])
+def export_host_data_single_jid(job_data_id: str, db_user: DbUser = Depends(get_db_and_user)):
     """
-    Fetch all host data records associated with a given job data ID.
+    Stream all host data records associated with a given job data ID, up to crud.MAX_ROWS records.
+
+    Unlike read_host_data_single_jid, which returns one page of ROW_LIMIT records, this endpoint reads the records
+    through a server-side cursor and writes them to the client as they arrive, so memory usage stays constant and the
+    client receives the first bytes before the query has finished.
 
     :param: job_data_id (str): The job data identifier used to filter the host data records.
-    :param: db_user (Tuple[
-    Session, models.ApiUser]): A tuple containing the database session and the current authenticated user.
+    :param: db_user (DbUser): The database session and the current authenticated user.
 
-    :return: List[schemas.HostData]: A list of HostData records where the job_data_id is associated with the job data
+    :return: StreamingResponse: A JSON array of HostData records where the job_data_id is associated with the job data
     records.
+    :raises HTTPException: If no records are found.
+    :raises ConnectionError: If no database connection is available, answered with a 500 by handle_unexpected_error.
+    """
+    logger.debug("Streaming host data for job data ID: %s", job_data_id)
+    records = crud.stream_host_data_by_job_id(job_data_id=job_data_id, row_limit=crud.MAX_ROWS)
+
+    # Read the first record up front so a missing job can still be answered with a 404
+    first_record = next(records, None)
+    if first_record is None:
+        logger.warning("No host data found for job data ID: %s", job_data_id)
+        raise HTTPException(status_code=404, detail=f"Host data for job ID {job_data_id} not found")
+
+    return StreamingResponse(stream_records(itertools.chain([first_record], records)),
+                             media_type="application/json")
+
+
+@app.get("/host_data_job_ids", response_model=List[schemas.HostData])
+def read_host_data_many_jobs(job_data_id: List[str] = Query(...),
+                             limit: int = Query(ROW_LIMIT, ge=1, le=ROW_LIMIT),
+                             db_user: DbUser = Depends(get_db_and_user)):
+    """
+    Fetch host data records for several job data IDs in a single database round-trip.
+
+    Clients that fan out from a list of jobs to their host data can pass the job_data_id query parameter repeatedly
+    (e.g. `?job_data_id=a&job_data_id=b`) instead of issuing one request, and one query, per job.
+
+    :param: job_data_id (List[str]): The job data identifiers used to filter the host data records.
+    :param: limit (int): The maximum number of records to return for each job.
+    :param: db_user (DbUser): The database session and the current authenticated user.
+
+    :return: List[schemas.HostData]: A list of HostData records grouped in the order of the given job data IDs.
     :raises HTTPException: If no records are found or if there is a database error.
     """
-    db, current_user = db_user
-    try:
-        logger.info("Fetching host data for job data ID: %s", job_data_id)
-        db_items = crud.get_host_data_by_job_id(job_data_id=job_data_id, row_limit=ROW_LIMIT)
+    logger.debug("Fetching host data for %s job data IDs", len(job_data_id))
+    db_items = crud.get_host_data_by_job_ids(job_data_ids=job_data_id, row_limit_per_job=limit)
 
-        if not db_items:
-            logger.warning("No host data found for job data ID: %s", job_data_id)
-            raise HTTPException(status_code=404, detail=f"Host data for job ID {job_data_id} not found")
+    if db_items is None:
+        logger.error("Failed to establish database connection.")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-        logger.info("Successfully retrieved host data for job data ID: %s", job_data_id)
-        return db_items
-    except Exception as e:
-        logger.error("Unexpected error while fetching host data for job data ID %s: %s", job_data_id, str(e))
-        raise Exception(status_code=500, detail=str(e))
+    if not db_items:
+        logger.warning("No host data found for job data IDs: %s", job_data_id)
+        raise HTTPException(status_code=404, detail=f"Host data for jobs {', '.join(job_data_id)} not found")
 
+    logger.debug("Successfully retrieved host data for %s job data IDs", len(job_data_id))
+    return set_etag(ORJSONResponse([record._asdict() for record in db_items]))
 
-@app.get("/host_data_node_id/{node_id}", response_model=List[schemas.HostData])
-def read_host_data_single_node(node_id: str, db_user: Tuple[Session, models.ApiUser] = Depends(get_db_and_user)):
+
+@app.get("/host_data_node_ids", response_model=List[schemas.HostData])
+def read_host_data_many_nodes(node_id: List[str] = Query(...),
+                              limit: int = Query(ROW_LIMIT, ge=1, le=ROW_LIMIT),
+                              db_user: DbUser = Depends(get_db_and_user)):
     """
-    Fetch all host data records associated with a given node ID.
+    Fetch host data records for several node IDs in a single database round-trip.
+
+    Clients that need data for many nodes can pass the node_id query parameter repeatedly
+    (e.g. `?node_id=a&node_id=b`) instead of issuing one request per node. The result is not paginated: when more than
+    `limit` records match, X-Has-More is true and the client narrows the node list or raises `limit`.
 
-    :param: node_id (str): The node identifier used to filter the host data records. :param: db_user (Tuple[Session,
-    models.ApiUser]): A tuple containing the database session and the current authenticated user.
+    :param: node_id (List[str]): The node identifiers used to filter the host data records.
+    :param: limit (int): The maximum number of records to return in total.
+    :param: db_user (DbUser): The database session and the current authenticated user.
 
-    :return: List[schemas.HostData]: A list of HostData records where the node_id is present in the host list.
+    :return: List[schemas.HostData]: A list of HostData records grouped in the order of the given node IDs.
     :raises HTTPException: If no records are found or if there is a database error.
     """
-    db, current_user = db_user
-    try:
-        logger.info("Fetching host data for node ID: %s", node_id)
-        db_items = crud.get_host_data_by_host_id(host_id=node_id, row_limit=ROW_LIMIT)
+    logger.debug("Fetching host data for %s node IDs", len(node_id))
+    db_items = crud.get_host_data_by_host_ids(host_ids=node_id, row_limit=limit + 1)
 
-        if not db_items:
-            logger.warning("No host data found for node ID: %s", node_id)
-            raise HTTPException(status_code=404, detail=f"Host data for node {node_id} not found")
-
-        logger.info("Successfully retrieved host data for node ID: %s", node_id)
-        return db_items
-    except Exception as e:
-        logger.error("Unexpected error while fetching host data for node ID %s: %s", node_id, str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    if db_items is None:
+        logger.error("Failed to establish database connection.")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    if not db_items:
+        logger.warning("No host data found for node IDs: %s", node_id)
+        raise HTTPException(status_code=404, detail=f"Host data for nodes {', '.join(node_id)} not found")
+
+    logger.debug("Successfully retrieved host data for %s node IDs", len(node_id))
+    return limit_page(db_items, limit)
 
 
 # this is for debugging only
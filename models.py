@@ -1,19 +1,35 @@
-from sqlalchemy import Column, Integer, Float, String, Text, ARRAY, TIMESTAMP, create_engine
+from sqlalchemy import Column, Integer, Float, String, Text, ARRAY, TIMESTAMP, Index, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from datetime import datetime
+from typing import List, NamedTuple, Optional
 import os
 
 Base = declarative_base()
 
+# Connection pool settings shared by both engines. pool_pre_ping discards connections the server has dropped and
+# pool_recycle replaces them before idle timeouts kick in. pool_use_lifo hands out the most recently used connection,
+# so under light load the surplus connections stay idle and are recycled instead of being kept warm in rotation.
+ENGINE_POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": True,
+    "pool_use_lifo": True,
+}
+
 # Engine and session for HostData and JobData models
 HOST_AND_JOB_DATA_ENGINE_URL = f"postgresql://{os.getenv('DBUSER')}:{os.getenv('DBPW')}@{os.getenv('DBHOST')}/{os.getenv('DBNAME')}"
-host_and_data_table_engine = create_engine(HOST_AND_JOB_DATA_ENGINE_URL)  # add echo=True to help debugging
-SessionLocalHostJob = sessionmaker(autocommit=False, autoflush=False, bind=host_and_data_table_engine)
+host_and_data_table_engine = create_engine(HOST_AND_JOB_DATA_ENGINE_URL, **ENGINE_POOL_OPTIONS)  # add echo=True to help debugging
+# The API only reads through these sessions, so attributes are not expired on commit (no reload round-trips)
+SessionLocalHostJob = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False,
+                                   bind=host_and_data_table_engine)
 
 # Engine and session for ApiUser model
 API_USER_ENGINE_URL = f"postgresql://{os.getenv('DBUSER_API')}:{os.getenv('DBPW_API')}@{os.getenv('DBHOST')}/{os.getenv('DBNAME')}"
-api_user_table_engine = create_engine(API_USER_ENGINE_URL)  # add echo=True to help debugging
-SessionLocalApiUser = sessionmaker(autocommit=False, autoflush=False, bind=api_user_table_engine)
+api_user_table_engine = create_engine(API_USER_ENGINE_URL, **ENGINE_POOL_OPTIONS)  # add echo=True to help debugging
+SessionLocalApiUser = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=api_user_table_engine)
 
 
 class HostData(Base):
@@ -29,6 +45,14 @@ class HostData(Base):
     diff = Column(Float)
     arc = Column(Float)
 
+    # B-tree indexes for the columns crud.py filters on, followed by the keyset crud.py orders by so that paginated
+    # lookups are a single index range scan. create_all only adds them with a new table; create_indexes.sql builds
+    # them on an existing database
+    __table_args__ = (
+        Index("ix_hostdata_host_time", "host", "time", "event"),
+        Index("ix_hostdata_jid_time", "jid", "time", "host", "event"),
+    )
+
 
 class JobData(Base):
     __tablename__ = 'job_data'
@@ -51,6 +75,17 @@ class JobData(Base):
     exitcode = Column(Text)
     host_list = Column(ARRAY(String))
 
+    # B-tree indexes for the columns crud.py filters on, followed by the keyset crud.py orders by, plus a GIN index
+    # so host_list array lookups avoid a seq scan. Keep create_indexes.sql in sync when changing them
+    __table_args__ = (
+        Index("ix_jobdata_jid", "jid", "start_time"),
+        Index("ix_jobdata_username", "username", "start_time", "jid"),
+        Index("ix_jobdata_jobname", "jobname", "start_time", "jid"),
+        Index("ix_jobdata_account", "account", "start_time", "jid"),
+        Index("ix_jobdata_exitcode", "exitcode", "start_time", "jid"),
+        Index("ix_jobdata_hostlist_gin", "host_list", postgresql_using="gin"),
+    )
+
 
 class ApiUser(Base):
     __tablename__ = 'api_user'
@@ -59,3 +94,50 @@ class ApiUser(Base):
     password_hash = Column(String(255), nullable=False)
     created_at = Column(TIMESTAMP)
     last_login = Column(TIMESTAMP)
+
+
+# Lightweight read-only records returned by the crud getters. The API only serializes query results, so building
+# instrumented ORM objects (identity map, attribute history) for every row is unnecessary. Field order matches the
+# column order of the tables.
+class HostDataRecord(NamedTuple):
+    time: datetime
+    host: str
+    jid: str
+    type: Optional[str]
+    event: str
+    unit: str
+    value: float
+    diff: Optional[float]
+    arc: Optional[float]
+
+
+class JobDataRecord(NamedTuple):
+    jid: str
+    submit_time: datetime
+    start_time: datetime
+    end_time: datetime
+    runtime: Optional[float]
+    timelimit: Optional[float]
+    node_hrs: Optional[float]
+    nhosts: Optional[int]
+    ncores: Optional[int]
+    ngpus: Optional[int]
+    username: str
+    account: Optional[str]
+    queue: Optional[str]
+    state: Optional[str]
+    jobname: Optional[str]
+    exitcode: Optional[str]
+    host_list: Optional[List[str]]
+
+
+class ApiUserRecord(NamedTuple):
+    id: int
+    username: str
+    password_hash: str
+
+
+if __name__ == "__main__":
+    # Create any missing tables, with their indexes; run once per deployment before starting the API workers. Indexes
+    # of tables that already exist are not added, create_indexes.sql builds those
+    Base.metadata.create_all(bind=host_and_data_table_engine)
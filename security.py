@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from passlib.context import CryptContext
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
@@ -8,9 +8,13 @@ from sqlalchemy.orm import Session
 from sqlalchemy.testing.pickleable import User
 from jwt import PyJWTError
 import jwt
+import bcrypt
+import hashlib
 import models
 import os
 import logging
+import threading
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,9 +24,45 @@ logger = logging.getLogger(__name__)
 SECRET_KEY = os.environ["FASTAPI_SECURITY_KEY"]
 ALGORITHM = os.environ["FASTAPI_SECURITY_KEY_ALGO"]
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Every access token must carry its subject and expiry; the decoder rejects tokens missing either. The decoder, its
+# options, the accepted algorithms and the encoded key are set up once instead of on every decode.
+JWT_DECODE_OPTIONS = {"require": ["exp", "sub"]}
+_jwt_decoder = jwt.PyJWT(options=JWT_DECODE_OPTIONS)
+_JWT_ALGORITHMS = [ALGORITHM]
+_JWT_KEY = SECRET_KEY.encode()
+
+# Users resolved from recently presented access tokens, so repeated requests with the same token skip the JWT decode
+# and the user query. The TTL bounds how long a deleted user or changed password goes unnoticed.
+_user_cache = TTLCache(maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")), ttl=int(os.getenv("USER_CACHE_TTL", "60")))
+# Tokens that recently failed validation are rejected without decoding them again, which blunts floods of requests
+# replaying the same bad or expired token
+_invalid_token_cache = TTLCache(maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+                                ttl=int(os.getenv("INVALID_TOKEN_CACHE_TTL", "2")))
+# Users looked up by username, so a new token or a login for a recently seen user skips the user query
+_user_record_cache = TTLCache(maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+                              ttl=int(os.getenv("USER_CACHE_TTL", "60")))
+_user_cache_lock = threading.Lock()
+
+# Recent successful password verifications, keyed on the stored hash and a digest of the password, so a client that
+# logs in repeatedly with the same credentials does not pay for a bcrypt verification every time. Failures are never
+# cached, and a changed password has a new hash and therefore a new key.
+_password_cache = TTLCache(maxsize=int(os.getenv("PASSWORD_CACHE_SIZE", "2048")),
+                           ttl=int(os.getenv("PASSWORD_CACHE_TTL", "60")))
+_password_cache_lock = threading.Lock()
+
+
+def _token_key(token: str) -> bytes:
+    """
+    Derive the cache key of an access token, so the caches hold short digests rather than the tokens themselves.
+
+    :param: token (str): The JWT access token.
+
+    :return: bytes: The first 16 bytes of the SHA-256 digest of the token.
+    """
+    return hashlib.sha256(token.encode()).digest()[:16]
 
 
-def get_db_api_user():
+async def get_db_api_user():
     """
     Create and manage a database session for API user models.
 
@@ -33,6 +73,8 @@ def get_db_api_user():
 
     This function is typically used in a 'with' statement or in a dependency injection scenario in a web framework
     like FastAPI to provide a session for a single request/response cycle.
+    Sessions connect lazily, and most requests are authenticated from the user cache without touching theirs, so the
+    dependency runs on the event loop instead of taking a worker thread for every request.
 
     Yields:
     :yield: Session: The SQLAlchemy Session object for API user database transactions.
@@ -59,7 +101,10 @@ class TokenData(BaseModel):
     username: Optional[str] = None
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor for new password hashes. Hashes made with a different cost or an older bcrypt variant ($2a$)
+# are flagged by password_hash_needs_update and re-hashed on the user's next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+_CURRENT_HASH_PREFIX = f"$2b${BCRYPT_ROUNDS:02d}$"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
@@ -67,9 +112,10 @@ def verify_password(plain_password, hashed_password):
     """
     Verify a plaintext password against a hashed password.
 
-    This function uses a password context to verify if a given plaintext password matches a hashed password.
-    It is commonly used in scenarios where user authentication is required, such as login processes. The function
-    relies on the 'pwd_context' object, which should be configured with the desired hashing algorithm.
+    This function uses the bcrypt library to verify if a given plaintext password matches a hashed password.
+    It is commonly used in scenarios where user authentication is required, such as login processes. The hash is
+    checked by the C implementation directly, without a passlib context detecting the scheme and re-encoding the hash
+    on every call.
 
     Parameters:
     :param: plain_password (str): The plaintext password that needs to be verified.
@@ -81,18 +127,27 @@ def verify_password(plain_password, hashed_password):
     # Verifying a user's password during login
     is_password_correct = verify_password(user_input_password, stored_hashed_password)
     """
-    logger.info("Verifying password")
-    return pwd_context.verify(plain_password, hashed_password)
+    logger.debug("Verifying password")
+    key = hashlib.sha256(plain_password.encode() + b"|" + hashed_password.encode()).digest()
+    with _password_cache_lock:
+        if key in _password_cache:
+            return True
+
+    verified = bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    if verified:
+        with _password_cache_lock:
+            _password_cache[key] = True
+    return verified
 
 
 def get_password_hash(password):
     """
     Generate a hashed version of a plaintext password.
 
-    This function takes a plaintext password and uses the 'pwd_context' object to create a hashed version of it.
-    The 'pwd_context' should be set up with a specific hashing algorithm (e.g., bcrypt, Argon2). Hashing passwords
-    is a crucial security measure for safely storing user passwords. Instead of storing the plaintext passwords,
-    only the hashes are stored, and these hashes are checked during user authentication.
+    This function takes a plaintext password and uses bcrypt, with a cost factor of BCRYPT_ROUNDS, to create a hashed
+    version of it. Hashing passwords is a crucial security measure for safely storing user passwords. Instead of
+    storing the plaintext passwords, only the hashes are stored, and these hashes are checked during user
+    authentication.
 
     Parameters:
     :param: password (str): The plaintext password that needs to be hashed.
@@ -103,7 +158,40 @@ def get_password_hash(password):
     # Hashing a new user's password for storage
     hashed_password = get_password_hash(new_user_password)
     """
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+
+def password_hash_needs_update(hashed_password: str) -> bool:
+    """
+    Tell whether a stored password hash was made with another bcrypt variant or cost than new hashes are.
+
+    Parameters:
+    :param: hashed_password (str): The stored password hash.
+
+    :return: bool: True if the hash should be replaced by get_password_hash on the next successful login.
+    """
+    return not hashed_password.startswith(_CURRENT_HASH_PREFIX)
+
+
+def update_password_hash(db: Session, user: models.ApiUserRecord, password: str):
+    """
+    Re-hash a user's password with the current bcrypt cost and store it.
+
+    Called after a successful login when password_hash_needs_update reports that the stored hash was made with a
+    different cost, so existing users move to BCRYPT_ROUNDS without having to reset their passwords. The user's
+    cached record is dropped so the next lookup reads the new hash.
+
+    Parameters:
+    :param: db (Session): An instance of the SQLAlchemy Session for API user database transactions.
+    :param: user (ApiUserRecord): The user whose password hash is replaced.
+    :param: password (str): The plaintext password the user just logged in with.
+    """
+    password_hash = get_password_hash(password)
+    db.query(models.ApiUser).filter(models.ApiUser.id == user.id).update({models.ApiUser.password_hash: password_hash})
+    db.commit()
+    with _user_cache_lock:
+        _user_record_cache.pop(user.username, None)
+    logger.info("Password hash of user %s updated to the current cost", user.username)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -125,20 +213,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     # Creating an access token for a user with a specific expiration time
     access_token = create_access_token(data={"sub": user_id}, expires_delta=timedelta(hours=1))
     """
-    logger.info("Creating access token")
+    logger.debug("Creating access token")
 
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
-        logger.info(f"Custom expiration delta set: {expires_delta}")
+        logger.debug("Custom expiration delta set: %s", expires_delta)
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-        logger.info("Using default expiration delta: 15 minutes")
+        logger.debug("Using default expiration delta: 15 minutes")
 
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-    logger.info("Access token created successfully")
+    logger.debug("Access token created successfully")
     return encoded_jwt
 
 
@@ -150,19 +238,35 @@ def get_user(db: Session, username: str):
     returns the first 'ApiUser' object that matches the username, if such a record exists. If no matching user is found,
     the function returns None. This is commonly used in user management systems to fetch user details based on their
     username.
+    Only the id, username and password hash are loaded, into a plain ApiUserRecord rather than an ORM instance tied to
+    the session, and found users are cached by username for USER_CACHE_TTL seconds.
 
     Parameters:
     :param: db (Session): An instance of the SQLAlchemy Session. This session is used to perform the database query.
     :param: username (str): The username of the user to be retrieved.
 
-    :return: ApiUser or None: An 'ApiUser' object representing the user record if found, otherwise None.
+    :return: ApiUserRecord or None: An 'ApiUserRecord' representing the user record if found, otherwise None.
 
     Usage example:
     # Retrieve a user record by username
     user = get_user(db_session, username="johndoe")
     """
-    logger.info("Getting user from the database.")
-    return db.query(models.ApiUser).filter(models.ApiUser.username == username).first()
+    with _user_cache_lock:
+        user = _user_record_cache.get(username)
+    if user is not None:
+        logger.debug("User %s served from the user cache", username)
+        return user
+
+    logger.debug("Getting user from the database.")
+    row = (db.query(models.ApiUser.id, models.ApiUser.username, models.ApiUser.password_hash)
+           .filter(models.ApiUser.username == username).first())
+    if row is None:
+        return None
+
+    user = models.ApiUserRecord._make(row)
+    with _user_cache_lock:
+        _user_record_cache[username] = user
+    return user
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db_api_user)):
@@ -173,6 +277,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     user record from the database. It requires a valid token passed as a Bearer token in the request's authorization header.
     If the token is invalid, expired, or if the user does not exist in the database, it raises an HTTP 401 Unauthorized exception.
     This function is typically used in web applications (e.g., with FastAPI) to authenticate and identify a user making a request.
+    Users are cached per token for USER_CACHE_TTL seconds (never beyond the token's expiry), so repeated requests with
+    the same token neither decode it again nor query the database. Tokens that fail validation are rejected from a
+    cache for INVALID_TOKEN_CACHE_TTL seconds.
 
     Parameters:
     :param: token (str): The JWT access token, obtained via dependency injection using `oauth2_scheme`.
@@ -190,33 +297,62 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     async def read_users_me(current_user: models.ApiUser = Depends(get_current_user)):
         return current_user
     """
-    logger.info("Retrieving current user from token")
+    logger.debug("Retrieving current user from token")
+
+    token_key = _token_key(token)
+    with _user_cache_lock:
+        cached = _user_cache.get(token_key)
+        invalid = token_key in _invalid_token_cache
+    if cached is not None and cached[1] > time.time():
+        logger.debug("User %s served from the user cache", cached[0].username)
+        return cached[0]
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.info("Token successfully decoded")
+    if invalid:
+        logger.debug("Token rejected from the invalid token cache")
+        raise credentials_exception
 
-        username: str = payload.get("sub")
-        if username is None:
-            logger.error("Username not found in token")
-            raise credentials_exception
+    try:
+        payload = _jwt_decoder.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
+        logger.debug("Token successfully decoded")
 
-        logger.info(f"Extracted username from token: {username}")
+        username: str = payload["sub"]
+        logger.debug("Extracted username from token: %s", username)
         user = get_user(db, username=username)
         if user is None:
-            logger.error(f"User not found in database for username: {username}")
+            logger.error("User not found in database for username: %s", username)
             raise credentials_exception
 
-        logger.info(f"User {username} retrieved successfully")
+        logger.debug("User %s retrieved successfully", username)
+        with _user_cache_lock:
+            _user_cache[token_key] = (user, payload["exp"])
         return user
-    except PyJWTError:
-        logger.exception("Error decoding JWT")
+    except PyJWTError as e:
+        logger.warning("Error decoding JWT: %s", e)
+        with _user_cache_lock:
+            _invalid_token_cache[token_key] = True
         raise credentials_exception
+    except HTTPException:
+        with _user_cache_lock:
+            _invalid_token_cache[token_key] = True
+        raise
+
+
+def clear_user_cache():
+    """
+    Remove every user from the user cache, e.g. after a user has been deleted or their password has changed.
+    """
+    with _user_cache_lock:
+        _user_cache.clear()
+        _invalid_token_cache.clear()
+        _user_record_cache.clear()
+    with _password_cache_lock:
+        _password_cache.clear()
+    logger.info("User cache cleared.")
 
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
@@ -1,13 +1,25 @@
 import unittest
+from datetime import datetime
 from unittest.mock import patch, MagicMock
+import crud
+import database_helpers as dbm
 from crud import (
     get_host_data_by_host_id, get_host_data_by_job_id, get_job_data_by_id,
     get_job_data_by_user, get_job_data_by_job_name, get_job_data_by_host_id,
-    get_job_data_by_account, get_job_data_by_exit_code
+    get_job_data_by_account, get_job_data_by_exit_code, get_host_data_by_host_ids, get_job_data_by_ids,
+    get_job_data_by_host_ids, get_host_data_by_job_id_columnar,
+    get_host_data_by_time_range,
+    get_host_and_job_data_by_job_id, get_job_data_by_ids_columnar, get_host_data_by_job_ids
 )
 
 
 class TestCrud(unittest.TestCase):
+    def setUp(self):
+        crud.clear_query_cache()
+        release_patcher = patch('crud.dbm.release_connection')
+        self.mock_release_connection = release_patcher.start()
+        self.addCleanup(release_patcher.stop)
+
     @patch('crud.dbm.get_database_connection')
     @patch('crud.dbm.execute_query')
     @patch('crud.dbm.convert_to_model')
@@ -25,10 +37,10 @@ class TestCrud(unittest.TestCase):
 
         self.assertEqual(result, mock_model_instances)
         mock_get_database_connection.assert_called_once()
-        mock_execute_query.assert_called_once_with(mock_connection, "SELECT * FROM host_data WHERE host = %s LIMIT %s",
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.HOST_DATA_COLUMNS} FROM host_data WHERE host = %s ORDER BY time, host, event LIMIT %s",
                                                    (host_id, row_limit))
-        mock_convert_to_model.assert_called_once_with(mock_records, mock_convert_to_model.record_to_host_data)
-        mock_connection.close.assert_called_once()
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_host_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
 
     @patch('crud.dbm.get_database_connection')
     @patch('crud.dbm.execute_query')
@@ -47,10 +59,52 @@ class TestCrud(unittest.TestCase):
 
         self.assertEqual(result, mock_model_instances)
         mock_get_database_connection.assert_called_once()
-        mock_execute_query.assert_called_once_with(mock_connection, "SELECT * FROM host_data WHERE jid = %s LIMIT %s",
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.HOST_DATA_COLUMNS} FROM host_data WHERE jid = %s ORDER BY time, host, event LIMIT %s",
                                                    (job_data_id, row_limit))
-        mock_convert_to_model.assert_called_once_with(mock_records, mock_convert_to_model.record_to_host_data)
-        mock_connection.close.assert_called_once()
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_host_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    def test_get_host_data_by_job_id_columnar(self, mock_execute_query, mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_execute_query.return_value = [
+            (1, 'host1', 'job123', 'type1', 'event1', 'unit1', 1.0, 0.5, 'arc1'),
+            (2, 'host2', 'job123', 'type1', 'event1', 'unit1', 2.0, 1.0, 'arc1'),
+        ]
+
+        result = get_host_data_by_job_id_columnar('job123', 10)
+
+        self.assertEqual(result['host'], ['host1', 'host2'])
+        self.assertEqual(result['value'], [1.0, 2.0])
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.HOST_DATA_COLUMNS} FROM host_data WHERE jid = %s ORDER BY time, host, event LIMIT %s",
+                                                   ('job123', 10))
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_host_data_by_time_range(self, mock_convert_to_model, mock_execute_query,
+                                         mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_records = [{'time': datetime(2023, 1, 1, 12), 'host': 'host1'}]
+        mock_execute_query.return_value = mock_records
+        mock_model_instances = ['model instance']
+        mock_convert_to_model.return_value = mock_model_instances
+
+        start_time = datetime(2023, 1, 1)
+        end_time = datetime(2023, 1, 2)
+        result = get_host_data_by_time_range(start_time, end_time, 10)
+
+        self.assertEqual(result, mock_model_instances)
+        mock_execute_query.assert_called_once_with(
+            mock_connection,
+            f"SELECT {crud.HOST_DATA_COLUMNS} FROM host_data WHERE time >= %s AND time < %s ORDER BY time, host, event LIMIT %s",
+            (start_time, end_time, 10))
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_host_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
 
     @patch('crud.dbm.get_database_connection')
     @patch('crud.dbm.execute_query')
@@ -69,10 +123,10 @@ class TestCrud(unittest.TestCase):
 
         self.assertEqual(result, mock_model_instances)
         mock_get_database_connection.assert_called_once()
-        mock_execute_query.assert_called_once_with(mock_connection, "SELECT * FROM job_data WHERE jid = %s LIMIT %s",
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE jid = %s ORDER BY start_time, jid LIMIT %s",
                                                    (job_data_id, row_limit))
-        mock_convert_to_model.assert_called_once_with(mock_records, mock_convert_to_model.record_to_job_data)
-        mock_connection.close.assert_called_once()
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_job_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
 
     @patch('crud.dbm.get_database_connection')
     @patch('crud.dbm.execute_query')
@@ -91,10 +145,26 @@ class TestCrud(unittest.TestCase):
 
         self.assertEqual(result, mock_model_instances)
         mock_get_database_connection.assert_called_once()
-        mock_execute_query.assert_called_once_with(mock_connection, "SELECT * FROM job_data WHERE username = %s LIMIT %s",
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE username = %s ORDER BY start_time, jid LIMIT %s",
                                                    (user_id, row_limit))
-        mock_convert_to_model.assert_called_once_with(mock_records, mock_convert_to_model.record_to_job_data)
-        mock_connection.close.assert_called_once()
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_job_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_job_data_by_user_without_hosts(self, mock_convert_to_model, mock_execute_query,
+                                                mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_execute_query.return_value = []
+        mock_convert_to_model.return_value = []
+
+        get_job_data_by_user('user123', 10, include_hosts=False)
+
+        query = mock_execute_query.call_args.args[1]
+        self.assertIn("NULL::varchar[] AS host_list", query)
+        self.assertNotIn(", host_list,", query)
 
     @patch('crud.dbm.get_database_connection')
     @patch('crud.dbm.execute_query')
@@ -113,10 +183,10 @@ class TestCrud(unittest.TestCase):
 
         self.assertEqual(result, mock_model_instances)
         mock_get_database_connection.assert_called_once()
-        mock_execute_query.assert_called_once_with(mock_connection, "SELECT * FROM job_data WHERE jobname = %s LIMIT %s",
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE jobname = %s ORDER BY start_time, jid LIMIT %s",
                                                    (job_name, row_limit))
-        mock_convert_to_model.assert_called_once_with(mock_records, mock_convert_to_model.record_to_job_data)
-        mock_connection.close.assert_called_once()
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_job_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
 
     @patch('crud.dbm.get_database_connection')
     @patch('crud.dbm.execute_query')
@@ -135,10 +205,10 @@ class TestCrud(unittest.TestCase):
 
         self.assertEqual(result, mock_model_instances)
         mock_get_database_connection.assert_called_once()
-        mock_execute_query.assert_called_once_with(mock_connection, "SELECT * FROM job_data WHERE %s = ANY(host_list) LIMIT %s",
+        mock_execute_query.assert_called_once_with(mock_connection, crud.HOST_LIST_INDEX_HINT + f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE host_list @> ARRAY[%s]::varchar[] ORDER BY start_time, jid LIMIT %s",
                                                    (host_id, row_limit))
-        mock_convert_to_model.assert_called_once_with(mock_records, mock_convert_to_model.record_to_job_data)
-        mock_connection.close.assert_called_once()
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_job_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
 
     @patch('crud.dbm.get_database_connection')
     @patch('crud.dbm.execute_query')
@@ -157,10 +227,10 @@ class TestCrud(unittest.TestCase):
 
         self.assertEqual(result, mock_model_instances)
         mock_get_database_connection.assert_called_once()
-        mock_execute_query.assert_called_once_with(mock_connection, "SELECT * FROM job_data WHERE account = %s LIMIT %s",
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE account = %s ORDER BY start_time, jid LIMIT %s",
                                                    (account_id, row_limit))
-        mock_convert_to_model.assert_called_once_with(mock_records, mock_convert_to_model.record_to_job_data)
-        mock_connection.close.assert_called_once()
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_job_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
 
     @patch('crud.dbm.get_database_connection')
     @patch('crud.dbm.execute_query')
@@ -179,10 +249,245 @@ class TestCrud(unittest.TestCase):
 
         self.assertEqual(result, mock_model_instances)
         mock_get_database_connection.assert_called_once()
-        mock_execute_query.assert_called_once_with(mock_connection, "SELECT * FROM job_data WHERE exitcode = %s LIMIT %s",
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE exitcode = %s ORDER BY start_time, jid LIMIT %s",
                                                    (exit_code, row_limit))
-        mock_convert_to_model.assert_called_once_with(mock_records, mock_convert_to_model.record_to_job_data)
-        mock_connection.close.assert_called_once()
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_job_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_job_data_by_account_cached(self, mock_convert_to_model, mock_execute_query,
+                                            mock_get_database_connection):
+        mock_get_database_connection.return_value = MagicMock()
+        mock_execute_query.return_value = [{'id': 1, 'account': 'account123', 'data': 'some data'}]
+        mock_model_instances = ['model instance']
+        mock_convert_to_model.return_value = mock_model_instances
+
+        first = get_job_data_by_account('account123', 10)
+        second = get_job_data_by_account('account123', 10)
+
+        self.assertEqual(first, mock_model_instances)
+        self.assertEqual(second, mock_model_instances)
+        self.assertEqual(mock_execute_query.call_count, 1)
+
+        crud.clear_query_cache()
+        get_job_data_by_account('account123', 10)
+        self.assertEqual(mock_execute_query.call_count, 2)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_job_data_by_job_name_cached_per_arguments(self, mock_convert_to_model, mock_execute_query,
+                                                           mock_get_database_connection):
+        mock_get_database_connection.return_value = MagicMock()
+        mock_execute_query.return_value = [{'id': 1, 'jobname': 'job_name', 'data': 'some data'}]
+        mock_convert_to_model.return_value = ['model instance']
+
+        get_job_data_by_job_name('job_name', 10)
+        get_job_data_by_job_name('job_name', 10)
+        get_job_data_by_job_name('job_name', 20)
+
+        self.assertEqual(mock_execute_query.call_count, 2)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_host_data_by_job_id_cached(self, mock_convert_to_model, mock_execute_query,
+                                            mock_get_database_connection):
+        mock_get_database_connection.return_value = MagicMock()
+        mock_execute_query.return_value = [{'id': 1, 'jid': 'job123', 'data': 'some data'}]
+        mock_convert_to_model.return_value = ['model instance']
+
+        get_host_data_by_job_id('job123', 10)
+        result = get_host_data_by_job_id('job123', 10)
+
+        self.assertEqual(result, ['model instance'])
+        self.assertEqual(mock_execute_query.call_count, 1)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_job_data_by_user_after_cursor(self, mock_convert_to_model, mock_execute_query,
+                                               mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_execute_query.return_value = []
+        mock_convert_to_model.return_value = []
+
+        after = (datetime(2024, 1, 1), 'job123')
+        result = get_job_data_by_user('user123', 10, after=after)
+
+        self.assertEqual(result, [])
+        mock_execute_query.assert_called_once_with(
+            mock_connection,
+            f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE username = %s AND (start_time, jid) > (%s, %s) ORDER BY start_time, jid LIMIT %s",
+            ('user123', datetime(2024, 1, 1), 'job123', 10))
+
+    @patch('crud.dbm.get_database_connection')
+    def test_get_host_data_by_host_id_invalid_cursor(self, mock_get_database_connection):
+        with self.assertRaises(ValueError):
+            get_host_data_by_host_id('example.com', 10, after=(datetime(2024, 1, 1),))
+        mock_get_database_connection.assert_not_called()
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_host_data_by_host_ids(self, mock_convert_to_model, mock_execute_query, mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_records = [{'id': 1, 'host': 'host2', 'data': 'some data'}]
+        mock_execute_query.return_value = mock_records
+        mock_model_instances = [MagicMock(host='host2'), MagicMock(host='host1'), MagicMock(host='host2')]
+        mock_convert_to_model.return_value = mock_model_instances
+
+        host_ids = ['host1', 'host2']
+        row_limit = 10
+        result = get_host_data_by_host_ids(host_ids, row_limit)
+
+        self.assertEqual(result, [mock_model_instances[1], mock_model_instances[0], mock_model_instances[2]])
+        mock_get_database_connection.assert_called_once()
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.HOST_DATA_COLUMNS} FROM host_data WHERE host = ANY(%s) LIMIT %s",
+                                                   (host_ids, row_limit))
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_host_data_by_host_id_clamps_row_limit(self, mock_convert_to_model, mock_execute_query,
+                                                       mock_get_database_connection):
+        mock_execute_query.return_value = []
+        mock_convert_to_model.return_value = []
+
+        get_host_data_by_host_id('host1', 10 ** 9)
+        self.assertEqual(mock_execute_query.call_args.args[2], ('host1', crud.MAX_ROWS))
+
+        get_host_data_by_host_id('host1', -5)
+        self.assertEqual(mock_execute_query.call_args.args[2], ('host1', 1))
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_host_data_by_job_ids(self, mock_convert_to_model, mock_execute_query, mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_execute_query.return_value = [{'id': 1, 'jid': 'job2', 'data': 'some data'}]
+        mock_model_instances = [MagicMock(jid='job2'), MagicMock(jid='job1')]
+        mock_convert_to_model.return_value = mock_model_instances
+
+        job_data_ids = ['job1', 'job2']
+        result = get_host_data_by_job_ids(job_data_ids, 10)
+
+        self.assertEqual(result, [mock_model_instances[1], mock_model_instances[0]])
+        mock_execute_query.assert_called_once_with(mock_connection, crud.HOST_DATA_BY_JOBS_SQL, (job_data_ids, 10))
+        self.assertIn("row_number() OVER (PARTITION BY jid", crud.HOST_DATA_BY_JOBS_SQL)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    def test_get_job_data_by_ids_empty(self, mock_execute_query, mock_get_database_connection):
+        result = get_job_data_by_ids([], 10)
+
+        self.assertEqual(result, [])
+        mock_get_database_connection.assert_not_called()
+        mock_execute_query.assert_not_called()
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_job_data_by_ids(self, mock_convert_to_model, mock_execute_query, mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_records = [{'id': 1, 'jid': 'job123', 'data': 'some data'}]
+        mock_execute_query.return_value = mock_records
+        mock_model_instances = [MagicMock(jid='job456'), MagicMock(jid='job123')]
+        mock_convert_to_model.return_value = mock_model_instances
+
+        job_data_ids = ['job123', 'job456']
+        row_limit = 10
+        result = get_job_data_by_ids(job_data_ids, row_limit)
+
+        self.assertEqual(result, [mock_model_instances[1], mock_model_instances[0]])
+        mock_execute_query.assert_called_once_with(mock_connection, f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE jid = ANY(%s) LIMIT %s",
+                                                   (job_data_ids, row_limit))
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_job_data_by_host_ids(self, mock_convert_to_model, mock_execute_query, mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_records = [{'id': 1, 'host_list': ['host1', 'host2'], 'data': 'some data'}]
+        mock_execute_query.return_value = mock_records
+        mock_model_instances = ['model instance']
+        mock_convert_to_model.return_value = mock_model_instances
+
+        host_ids = ['host1', 'host2']
+        row_limit = 10
+        result = get_job_data_by_host_ids(host_ids, row_limit)
+
+        self.assertEqual(result, mock_model_instances)
+        mock_execute_query.assert_called_once_with(
+            mock_connection,
+            crud.HOST_LIST_INDEX_HINT + f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE host_list && %s::varchar[] ORDER BY start_time, jid LIMIT %s",
+            (host_ids, row_limit))
+        mock_convert_to_model.assert_called_once_with(mock_records, dbm.record_to_job_data)
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    @patch('crud.dbm.convert_to_model')
+    def test_get_host_and_job_data_by_job_id(self, mock_convert_to_model, mock_execute_query,
+                                             mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_execute_query.side_effect = [['job record'], ['host record']]
+        mock_convert_to_model.side_effect = lambda records, conversion_function: records
+
+        result = get_host_and_job_data_by_job_id('job123', 10)
+
+        self.assertEqual(result, {'job': ['job record'], 'host': ['host record']})
+        mock_get_database_connection.assert_called_once()
+        mock_execute_query.assert_any_call(
+            mock_connection, f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE jid = %s ORDER BY start_time, jid LIMIT %s", ('job123', 10))
+        mock_execute_query.assert_any_call(
+            mock_connection, f"SELECT {crud.HOST_DATA_COLUMNS} FROM host_data WHERE jid = %s ORDER BY time, host, event LIMIT %s",
+            ('job123', 10))
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('crud.dbm.get_database_connection')
+    @patch('crud.dbm.execute_query')
+    def test_get_job_data_by_ids_columnar(self, mock_execute_query, mock_get_database_connection):
+        mock_connection = MagicMock()
+        mock_get_database_connection.return_value = mock_connection
+        mock_execute_query.return_value = [
+            ('job1', None, None, None, None, None, None, None, None, None, 'user1', None, None, None, None, None, None),
+            ('job2', None, None, None, None, None, None, None, None, None, 'user2', None, None, None, None, None, None),
+        ]
+
+        result = get_job_data_by_ids_columnar(['job1', 'job2'], 10)
+
+        self.assertEqual(result['jid'], ['job1', 'job2'])
+        self.assertEqual(result['username'], ['user1', 'user2'])
+        mock_execute_query.assert_called_once_with(
+            mock_connection, f"SELECT {crud.JOB_DATA_COLUMNS} FROM job_data WHERE jid = ANY(%s) LIMIT %s",
+            (['job1', 'job2'], 10))
+        self.mock_release_connection.assert_called_once_with(mock_connection)
+
+    @patch('crud.dbm.get_database_connection')
+    def test_get_job_data_by_ids_columnar_empty(self, mock_get_database_connection):
+        result = get_job_data_by_ids_columnar([], 10)
+
+        self.assertEqual(result['jid'], [])
+        mock_get_database_connection.assert_not_called()
+
+    @patch('crud.dbm.get_database_connection', return_value=None)
+    def test_stream_host_data_by_job_id_without_connection(self, mock_get_database_connection):
+        with self.assertRaises(ConnectionError):
+            next(crud.stream_host_data_by_job_id('job1', 10))
+        self.mock_release_connection.assert_not_called()
 
 
 if __name__ == '__main__':
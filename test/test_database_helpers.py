@@ -5,6 +5,9 @@ import models
 
 
 class TestDatabaseHelpers(unittest.TestCase):
+    def tearDown(self):
+        dbm.close_connection_pool()
+
     @patch.dict('os.environ', {'DBHOST': 'localhost', 'DBPW': 'password', 'DBNAME': 'testdb', 'DBUSER': 'testuser'})
     @patch('psycopg2.connect')
     def test_get_database_connection_success(self, mock_connect):
@@ -15,9 +18,32 @@ class TestDatabaseHelpers(unittest.TestCase):
     def test_get_database_connection_missing_credentials(self):
         self.assertIsNone(dbm.get_database_connection())
 
+    @patch.dict('os.environ', {'DBHOST': 'localhost', 'DBPW': 'password', 'DBNAME': 'testdb', 'DBUSER': 'testuser'})
+    @patch('psycopg2.connect')
+    def test_release_connection_reuses_pooled_connection(self, mock_connect):
+        mock_connect.return_value.closed = 0
+        connection = dbm.get_database_connection()
+        dbm.release_connection(connection)
+
+        self.assertIs(dbm.get_database_connection(), connection)
+        connection.rollback.assert_called()
+        mock_connect.assert_called_once()
+
+    @patch.dict('os.environ', {'DBHOST': 'localhost', 'DBPW': 'password', 'DBNAME': 'testdb', 'DBUSER': 'testuser'})
+    @patch('database_helpers.DB_POOL_MAX_CONN', 1)
+    @patch('database_helpers.DB_POOL_TIMEOUT', 0)
+    @patch('psycopg2.connect')
+    def test_get_database_connection_pool_exhausted(self, mock_connect):
+        mock_connect.return_value.closed = 0
+        connection = dbm.get_database_connection()
+
+        self.assertIsNone(dbm.get_database_connection())
+        dbm.release_connection(connection)
+        self.assertIs(dbm.get_database_connection(), connection)
+
+    @patch('database_helpers.logger.isEnabledFor', return_value=True)
     @patch('database_helpers.logger.debug')
-    @patch('database_helpers.logger.info')
-    def test_execute_query_success(self, mock_info, mock_debug):
+    def test_execute_query_success(self, mock_debug, mock_is_enabled_for):
         mock_connection = MagicMock()
         mock_cursor = MagicMock()
         mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
@@ -25,27 +51,128 @@ class TestDatabaseHelpers(unittest.TestCase):
 
         results = dbm.execute_query(mock_connection, "SELECT * FROM test")
 
-        mock_debug.assert_called_once_with("Executing query: SELECT * FROM test...")
+        mock_debug.assert_any_call("Executing query: %s...", "SELECT * FROM test")
+        mock_cursor.execute.assert_called_once_with("SELECT * FROM test", None)
+        mock_debug.assert_called_with("Query executed successfully. Number of records fetched: %s", 2)
+        self.assertEqual(results, [('result1',), ('result2',)])
+
+    @patch('database_helpers.SLOW_QUERY_MS', -1)
+    @patch('database_helpers.logger.warning')
+    def test_execute_query_logs_slow_query(self, mock_warning):
+        mock_connection = MagicMock()
+        mock_connection.cursor.return_value.__enter__.return_value.fetchall.return_value = []
+
+        dbm.execute_query(mock_connection, "SELECT * FROM test")
+
+        self.assertEqual(mock_warning.call_args.args[0], "Slow query (%.0f ms): %s...")
+        self.assertEqual(mock_warning.call_args.args[2], "SELECT * FROM test")
+
+    def test_execute_query_counts_queries(self):
+        mock_connection = MagicMock()
+        mock_connection.cursor.return_value.__enter__.return_value.fetchall.return_value = []
+
+        query_count = dbm.start_query_count()
+        dbm.execute_query(mock_connection, "SELECT * FROM test")
+        dbm.execute_query(mock_connection, "SELECT * FROM test")
+
+        self.assertEqual(query_count, [2])
+
+    def test_execute_query_prepares_parameterized_query_once(self):
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = [('result1',)]
+        query = "SELECT * FROM test WHERE id = %s LIMIT %s"
+
+        dbm.execute_query(mock_connection, query, ('id1', 10))
+        dbm.execute_query(mock_connection, query, ('id2', 10))
+
+        statement_name = dbm._prepared_statements[mock_connection][query]
+        mock_cursor.execute.assert_any_call(f"PREPARE {statement_name} AS SELECT * FROM test WHERE id = $1 LIMIT $2")
+        mock_cursor.execute.assert_called_with(f"EXECUTE {statement_name} (%s, %s)", ('id2', 10))
+        self.assertEqual(mock_cursor.execute.call_count, 3)
+
+    def test_execute_query_forgets_statement_on_error(self):
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.side_effect = Exception("connection lost")
+        query = "SELECT * FROM test WHERE id = %s"
+
+        with self.assertRaises(Exception):
+            dbm.execute_query(mock_connection, query, ('id1',))
+
+        self.assertNotIn(query, dbm._prepared_statements[mock_connection])
+        statement_name = mock_cursor.execute.call_args_list[0].args[0].split()[1]
+        mock_connection.rollback.assert_called_once()
+        mock_cursor.execute.assert_called_with(f"DEALLOCATE {statement_name}")
+
+    @patch('database_helpers.logger.debug')
+    def test_stream_query_success(self, mock_debug):
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.__iter__.return_value = iter([('result1',), ('result2',)])
+
+        results = list(dbm.stream_query(mock_connection, "SELECT * FROM test", batch_size=500))
+
+        self.assertTrue(mock_connection.cursor.call_args.kwargs['name'].startswith('stream_'))
+        self.assertEqual(mock_cursor.itersize, 500)
         mock_cursor.execute.assert_called_once_with("SELECT * FROM test", None)
-        mock_info.assert_called_once_with("Query executed successfully. Number of records fetched: 2")
+        mock_cursor.fetchall.assert_not_called()
+        mock_debug.assert_called_once_with("Query streamed successfully. Number of records fetched: %s", 2)
         self.assertEqual(results, [('result1',), ('result2',)])
 
-    @patch('database_helpers.logger.info')
-    def test_convert_to_model_success(self, mock_info):
+    @patch('database_helpers.logger.debug')
+    def test_convert_to_model_success(self, mock_debug):
         mock_conversion_function = MagicMock(side_effect=lambda x: x)
         data = [('record1',), ('record2',)]
 
         converted_data = dbm.convert_to_model(data, mock_conversion_function)
 
-        mock_info.assert_any_call("Starting conversion of query results to model instances.")
-        mock_info.assert_called_with("Conversion successful. Number of records converted: 2")
+        mock_debug.assert_any_call("Starting conversion of query results to model instances.")
+        mock_debug.assert_called_with("Conversion successful. Number of records converted: %s", 2)
         self.assertEqual(converted_data, [('record1',), ('record2',)])
 
+    def test_convert_to_model_streamed(self):
+        data = iter([('record1',), ('record2',)])
+
+        converted_data = dbm.convert_to_model(data, lambda record: record[0])
+
+        self.assertNotIsInstance(converted_data, list)
+        self.assertEqual(list(converted_data), ['record1', 'record2'])
+
+    def test_convert_to_model_record_converter(self):
+        data = [(1, 'host1', 'jid1', 'type1', 'event1', 'unit1', 1.0, 0.5, 2.0)]
+
+        converted_data = dbm.convert_to_model(data, dbm.record_to_host_data)
+
+        self.assertIsInstance(converted_data[0], models.HostDataRecord)
+        self.assertEqual(converted_data[0].host, 'host1')
+
+    def test_convert_to_model_record_converter_invalid_record_length(self):
+        with self.assertRaises(ValueError):
+            dbm.convert_to_model([(1, 'host1')], dbm.record_to_host_data)
+
+    def test_convert_to_columns_success(self):
+        data = [(1, 'host1'), (2, 'host2')]
+
+        columns = dbm.convert_to_columns(data, ('time', 'host'))
+
+        self.assertEqual(columns, {'time': [1, 2], 'host': ['host1', 'host2']})
+
+    def test_convert_to_columns_empty(self):
+        self.assertEqual(dbm.convert_to_columns([], ('time', 'host')), {'time': [], 'host': []})
+
+    def test_convert_to_columns_invalid_record_length(self):
+        with self.assertRaises(ValueError):
+            dbm.convert_to_columns([(1,)], ('time', 'host'))
+
     def test_record_to_host_data_success(self):
         record = (1, 'host1', 'jid1', 'type1', 'event1', 'unit1', 'value1', 'diff1', 'arc1')
         host_data = dbm.record_to_host_data(record)
 
-        self.assertIsInstance(host_data, models.HostData)
+        self.assertIsInstance(host_data, models.HostDataRecord)
         self.assertEqual(host_data.time, 1)
         self.assertEqual(host_data.host, 'host1')
         self.assertEqual(host_data.jid, 'jid1')
@@ -65,7 +192,7 @@ class TestDatabaseHelpers(unittest.TestCase):
         record = ('jid1', 1, 2, 3, 4, 5, 6, 7, 8, 9, 'user1', 'account1', 'queue1', 'state1', 'jobname1', 0, ['host1', 'host2'])
         job_data = dbm.record_to_job_data(record)
 
-        self.assertIsInstance(job_data, models.JobData)
+        self.assertIsInstance(job_data, models.JobDataRecord)
         self.assertEqual(job_data.jid, 'jid1')
         self.assertEqual(job_data.submit_time, 1)
         self.assertEqual(job_data.start_time, 2)
@@ -1,25 +1,38 @@
+import orjson
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from unittest.mock import patch, MagicMock
 from typing import Tuple
-from datetime import timedelta
+from datetime import datetime, timedelta
 import security
 
-from main import app, get_db_host_job_tables, get_db_api_user, get_db_and_user, login, read_job_data_single_jid, \
+from main import app, encode_cursor, decode_cursor, stream_records, get_db_host_job_tables, get_db_api_user, get_db_and_user, login, read_job_data_single_jid, \
     read_job_data_single_user, read_job_data_single_job_name, read_job_data_single_host, read_job_data_single_account, \
     read_job_data_single_exit_code, read_host_data_single_jid, read_host_data_single_node
-from models import Base, ApiUser
+from models import Base, ApiUser, HostDataRecord, JobDataRecord
+from fastapi import HTTPException
 from security import create_access_token
 import crud
 
-# Create a test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# Create an in-memory test database; StaticPool shares its single connection between sessions and threads
+SQLALCHEMY_DATABASE_URL = "sqlite://"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base.metadata.create_all(bind=engine)
+
+# pysqlite does not emit BEGIN itself, which breaks savepoints; let SQLAlchemy control the transactions instead
+@event.listens_for(engine, "connect")
+def disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def begin_sqlite_transaction(connection):
+    connection.exec_driver_sql("BEGIN")
 
 client = TestClient(app)
 
@@ -44,17 +57,35 @@ app.dependency_overrides[get_db_host_job_tables] = override_get_db_host_job_tabl
 app.dependency_overrides[get_db_api_user] = override_get_db_api_user
 
 
+@pytest.fixture(scope="session")
+def hashed_password():
+    # bcrypt is slow by design, so the test password is hashed once for the whole session
+    return security.get_password_hash("test_password")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database_schema():
+    # Only the user table lives in SQLAlchemy; the job and host data tables use PostgreSQL ARRAY columns, which SQLite
+    # cannot create, and their queries are mocked in these tests
+    Base.metadata.create_all(bind=engine, tables=[ApiUser.__table__])
+    yield
+    Base.metadata.drop_all(bind=engine, tables=[ApiUser.__table__])
+
+
 @pytest.fixture
 def test_db():
-    Base.metadata.create_all(bind=engine)
+    # Sessions join an outer transaction, so their commits become savepoints that are rolled back after the test
+    connection = engine.connect()
+    transaction = connection.begin()
+    TestingSessionLocal.configure(bind=connection, join_transaction_mode="create_savepoint")
     yield
-    Base.metadata.drop_all(bind=engine)
+    TestingSessionLocal.configure(bind=engine, join_transaction_mode="conservative_savepoint")
+    transaction.rollback()
+    connection.close()
 
 
-def test_login(test_db):
+def test_login(test_db, hashed_password):
     # Create a test user
-    password = "test_password"
-    hashed_password = security.get_password_hash(password)
     user = ApiUser(username="test_user", password_hash=hashed_password)
     db = TestingSessionLocal()
     db.add(user)
@@ -77,210 +108,200 @@ def test_login(test_db):
     assert response.json()["detail"] == "Incorrect username or password"
 
 
-def test_read_job_data_single_jid(test_db):
-    # Create a test user and generate an access token
-    password = "test_password"
-    hashed_password = security.get_password_hash(password)
+def test_login_survives_failed_password_rehash(test_db, hashed_password):
     user = ApiUser(username="test_user", password_hash=hashed_password)
     db = TestingSessionLocal()
     db.add(user)
     db.commit()
-    access_token = create_access_token(data={"sub": user.username}, expires_delta=timedelta(minutes=30))
 
-    # Mock the crud.get_job_data_by_id function
-    job_data = [MagicMock()]
-    with patch.object(crud, "get_job_data_by_id", return_value=job_data):
-        # Test successful retrieval of job data
-        response = client.get("/job_data_job_id/test_job_id", headers={"Authorization": f"Bearer {access_token}"})
-        assert response.status_code == 200
-        assert response.json() == job_data
-
-        # Test job ID not found
-        with patch.object(crud, "get_job_data_by_id", return_value=None):
-            response = client.get("/job_data_job_id/invalid_job_id",
-                                  headers={"Authorization": f"Bearer {access_token}"})
-            assert response.status_code == 404
-            assert response.json()["detail"] == "Job ID invalid_job_id not found"
+    with patch.object(security, "password_hash_needs_update", return_value=True), \
+            patch.object(security, "update_password_hash", side_effect=OperationalError("UPDATE", {}, Exception())):
+        response = client.post("/token", data={"username": "test_user", "password": "test_password"})
+    assert response.status_code == 200
+    assert "access_token" in response.json()
 
 
-def test_read_job_data_single_user(test_db):
+@pytest.fixture
+def access_token(test_db, hashed_password):
     # Create a test user and generate an access token
-    password = "test_password"
-    hashed_password = security.get_password_hash(password)
     user = ApiUser(username="test_user", password_hash=hashed_password)
     db = TestingSessionLocal()
     db.add(user)
     db.commit()
-    access_token = create_access_token(data={"sub": user.username}, expires_delta=timedelta(minutes=30))
-
-    # Mock the crud.get_job_data_by_user function
-    job_data = [MagicMock()]
-    with patch.object(crud, "get_job_data_by_user", return_value=job_data):
-        # Test successful retrieval of job data
-        response = client.get("/job_data_user_id/test_user_id", headers={"Authorization": f"Bearer {access_token}"})
+    return create_access_token(data={"sub": user.username}, expires_delta=timedelta(minutes=30))
+
+
+JOB_RECORD = JobDataRecord("job1", datetime(2024, 1, 1), datetime(2024, 1, 1), datetime(2024, 1, 2), 1.0, 2.0, 1.0, 1,
+                           4, 0, "test_user", "account1", "queue1", "COMPLETED", "job_name", "0", ["host1"])
+HOST_RECORD = HostDataRecord(datetime(2024, 1, 1), "host1", "job1", None, "cpu", "%", 1.0, None, None)
+
+
+@pytest.mark.parametrize("crud_function, record, path, not_found_detail", [
+    ("get_job_data_by_id", JOB_RECORD, "/job_data_job_id/{}", "Job ID {} not found"),
+    ("get_job_data_by_user", JOB_RECORD, "/job_data_user_id/{}", "User ID {} not found"),
+    ("get_job_data_by_job_name", JOB_RECORD, "/job_data_job_name/{}", "Job name {} not found"),
+    ("get_job_data_by_host_id", JOB_RECORD, "/job_data_host_id/{}", "Host ID {} not found"),
+    ("get_job_data_by_account", JOB_RECORD, "/job_data_account_id/{}", "Account ID {} not found"),
+    ("get_job_data_by_exit_code", JOB_RECORD, "/job_data_exit_code/{}", "Exit code {} not found"),
+    ("get_host_data_by_job_id", HOST_RECORD, "/host_data_job_id/{}", "Host data for job ID {} not found"),
+    ("get_host_data_by_host_id", HOST_RECORD, "/host_data_node_id/{}", "Host data for node {} not found"),
+])
+def test_read_single_key_endpoint(access_token, crud_function, record, path, not_found_detail):
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    # Mock the crud lookup behind the endpoint
+    with patch.object(crud, crud_function, return_value=[record]):
+        # Test successful retrieval of the records
+        response = client.get(path.format("test_key"), headers=headers)
         assert response.status_code == 200
-        assert response.json() == job_data
+        assert [item["jid"] for item in response.json()] == ["job1"]
 
-        # Test user ID not found
-        with patch.object(crud, "get_job_data_by_user", return_value=[]):
-            response = client.get("/job_data_user_id/invalid_user_id",
-                                  headers={"Authorization": f"Bearer {access_token}"})
+        # Test key not found
+        with patch.object(crud, crud_function, return_value=[]):
+            response = client.get(path.format("invalid_key"), headers=headers)
             assert response.status_code == 404
-            assert response.json()["detail"] == "User ID invalid_user_id not found"
+            assert response.json()["detail"] == not_found_detail.format("invalid_key")
 
 
-def test_read_job_data_single_job_name(test_db):
-    # Create a test user and generate an access token
-    password = "test_password"
-    hashed_password = security.get_password_hash(password)
-    user = ApiUser(username="test_user", password_hash=hashed_password)
-    db = TestingSessionLocal()
-    db.add(user)
-    db.commit()
-    access_token = create_access_token(data={"sub": user.username}, expires_delta=timedelta(minutes=30))
+def test_unexpected_error_returns_generic_500(access_token):
+    # The error details stay in the server log and are not returned to the client
+    error_client = TestClient(app, raise_server_exceptions=False)
+    with patch.object(crud, "get_job_data_by_id", side_effect=RuntimeError("connection to db-host failed")):
+        response = error_client.get("/job_data_job_id/job1", headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Internal server error"
 
-    # Mock the crud.get_job_data_by_job_name function
-    job_data = [MagicMock()]
-    with patch.object(crud, "get_job_data_by_job_name", return_value=job_data):
-        # Test successful retrieval of job data
-        response = client.get("/job_data_job_name/test_job_name", headers={"Authorization": f"Bearer {access_token}"})
-        assert response.status_code == 200
-        assert response.json() == job_data
 
-        # Test job name not found
-        with patch.object(crud, "get_job_data_by_job_name", return_value=[]):
-            response = client.get("/job_data_job_name/invalid_job_name",
-                                  headers={"Authorization": f"Bearer {access_token}"})
-            assert response.status_code == 404
-            assert response.json()["detail"] == "Job name invalid_job_name not found"
+def test_pagination_cursor_round_trip():
+    record = HostDataRecord(datetime(2024, 1, 1, 12, 30), "host1", "job1", None, "event", "unit", 1.0, None, None)
 
+    cursor = encode_cursor(record, crud.HOST_DATA_KEYSET)
+
+    assert decode_cursor(cursor, crud.HOST_DATA_KEYSET) == (datetime(2024, 1, 1, 12, 30), "host1", "event")
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, crud.JOB_DATA_KEYSET)
+    with pytest.raises(HTTPException):
+        decode_cursor("not a cursor", crud.HOST_DATA_KEYSET)
 
-def test_read_job_data_single_host(test_db):
-    # Create a test user and generate an access token
-    password = "test_password"
-    hashed_password = security.get_password_hash(password)
-    user = ApiUser(username="test_user", password_hash=hashed_password)
-    db = TestingSessionLocal()
-    db.add(user)
-    db.commit()
-    access_token = create_access_token(data={"sub": user.username}, expires_delta=timedelta(minutes=30))
 
-    # Mock the crud.get_job_data_by_host_id function
-    job_data = [MagicMock()]
-    with patch.object(crud, "get_job_data_by_host_id", return_value=job_data):
-        # Test successful retrieval of job data
-        response = client.get("/job_data_host_id/test_host_id", headers={"Authorization": f"Bearer {access_token}"})
+def test_large_responses_are_compressed(access_token):
+    host_data = [HostDataRecord(datetime(2024, 1, 1), f"host{i}", "job1", None, "cpu", "%", 1.0, None, None)
+                 for i in range(100)]
+    with patch.object(crud, "get_host_data_by_job_ids", return_value=host_data):
+        response = client.get("/host_data_job_ids?job_data_id=job1",
+                              headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": "gzip"})
         assert response.status_code == 200
-        assert response.json() == job_data
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert len(response.json()) == 100
 
-        # Test host ID not found
-        with patch.object(crud, "get_job_data_by_host_id", return_value=[]):
-            response = client.get("/job_data_host_id/invalid_host_id",
-                                  headers={"Authorization": f"Bearer {access_token}"})
-            assert response.status_code == 404
-            assert response.json()["detail"] == "Host ID invalid_host_id not found"
 
+def test_unchanged_page_is_not_modified(access_token):
+    host_data = [HostDataRecord(datetime(2024, 1, 1), "host1", "job1", None, "cpu", "%", 1.0, None, None)]
+    with patch.object(crud, "get_host_data_by_job_id", return_value=host_data):
+        response = client.get("/host_data_job_id/job1", headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        # The client already holds this page
+        response = client.get("/host_data_job_id/job1",
+                              headers={"Authorization": f"Bearer {access_token}", "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+        # A stale ETag gets the full page
+        response = client.get("/host_data_job_id/job1",
+                              headers={"Authorization": f"Bearer {access_token}", "If-None-Match": 'W/"stale"'})
+        assert response.status_code == 200
 
-def test_read_job_data_single_account(test_db):
-    # Create a test user and generate an access token
-    password = "test_password"
-    hashed_password = security.get_password_hash(password)
-    user = ApiUser(username="test_user", password_hash=hashed_password)
-    db = TestingSessionLocal()
-    db.add(user)
-    db.commit()
-    access_token = create_access_token(data={"sub": user.username}, expires_delta=timedelta(minutes=30))
 
-    # Mock the crud.get_job_data_by_account function
-    job_data = [MagicMock()]
-    with patch.object(crud, "get_job_data_by_account", return_value=job_data):
-        # Test successful retrieval of job data
-        response = client.get("/job_data_account_id/test_account_id",
+def test_export_host_data_single_jid(access_token):
+    # Mock the crud.stream_host_data_by_job_id generator
+    host_data = [HostDataRecord(datetime(2024, 1, 1), "host1", "test_job_data_id", None, "event", "unit", 1.0, None,
+                                None)] * 2
+    with patch.object(crud, "stream_host_data_by_job_id", return_value=iter(host_data)) as mock_stream:
+        # Test successful streaming of host data
+        response = client.get("/host_data_job_id/test_job_data_id/export",
                               headers={"Authorization": f"Bearer {access_token}"})
         assert response.status_code == 200
-        assert response.json() == job_data
+        assert response.json() == [dict(record._asdict(), time="2024-01-01T00:00:00") for record in host_data]
+        mock_stream.assert_called_once_with(job_data_id="test_job_data_id", row_limit=crud.MAX_ROWS)
 
-        # Test account ID not found
-        with patch.object(crud, "get_job_data_by_account", return_value=[]):
-            response = client.get("/job_data_account_id/invalid_account_id",
+        # Test job data ID not found
+        with patch.object(crud, "stream_host_data_by_job_id", return_value=iter([])):
+            response = client.get("/host_data_job_id/invalid_job_data_id/export",
                                   headers={"Authorization": f"Bearer {access_token}"})
             assert response.status_code == 404
-            assert response.json()["detail"] == "Account ID invalid_account_id not found"
+            assert response.json()["detail"] == "Host data for job ID invalid_job_data_id not found"
 
+    # Test database outage
+    error_client = TestClient(app, raise_server_exceptions=False)
+    with patch.object(crud.dbm, "get_database_connection", return_value=None):
+        response = error_client.get("/host_data_job_id/test_job_data_id/export",
+                                    headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Internal server error"
 
-def test_read_job_data_single_exit_code(test_db):
-    # Create a test user and generate an access token
-    password = "test_password"
-    hashed_password = security.get_password_hash(password)
-    user = ApiUser(username="test_user", password_hash=hashed_password)
-    db = TestingSessionLocal()
-    db.add(user)
-    db.commit()
-    access_token = create_access_token(data={"sub": user.username}, expires_delta=timedelta(minutes=30))
 
-    # Mock the crud.get_job_data_by_exit_code function
-    job_data = [MagicMock()]
-    with patch.object(crud, "get_job_data_by_exit_code", return_value=job_data):
-        # Test successful retrieval of job data
-        response = client.get("/job_data_exit_code/test_exit_code", headers={"Authorization": f"Bearer {access_token}"})
-        assert response.status_code == 200
-        assert response.json() == job_data
+def test_stream_records_in_batches():
+    records = [HostDataRecord(datetime(2024, 1, 1), f"host{i}", "job1", None, "cpu", "%", 1.0, None, None)
+               for i in range(5)]
 
-        # Test exit code not found
-        with patch.object(crud, "get_job_data_by_exit_code", return_value=[]):
-            response = client.get("/job_data_exit_code/invalid_exit_code",
-                                  headers={"Authorization": f"Bearer {access_token}"})
-            assert response.status_code == 404
-            assert response.json()["detail"] == "Exit code invalid_exit_code not found"
+    chunks = list(stream_records(iter(records), batch_size=2))
 
+    assert len(chunks) == 4
+    assert [record["host"] for record in orjson.loads(b"".join(chunks))] == [f"host{i}" for i in range(5)]
+    assert b"".join(stream_records(iter([]))) == b"[]"
 
-def test_read_host_data_single_jid(test_db):
-    # Create a test user and generate an access token
-    password = "test_password"
-    hashed_password = security.get_password_hash(password)
-    user = ApiUser(username="test_user", password_hash=hashed_password)
-    db = TestingSessionLocal()
-    db.add(user)
-    db.commit()
-    access_token = create_access_token(data={"sub": user.username}, expires_delta=timedelta(minutes=30))
 
-    # Mock the crud.get_host_data_by_job_id function
-    host_data = [MagicMock()]
-    with patch.object(crud, "get_host_data_by_job_id", return_value=host_data):
-        # Test successful retrieval of host data
-        response = client.get("/host_data_job_id/test_job_data_id", headers={"Authorization": f"Bearer {access_token}"})
+def test_read_host_data_many_nodes(access_token):
+    # Mock the crud.get_host_data_by_host_ids function
+    host_data = [HOST_RECORD, HOST_RECORD._replace(host="host2")]
+    with patch.object(crud, "get_host_data_by_host_ids", return_value=host_data) as mock_get:
+        # Test successful retrieval of host data for several nodes in one call
+        response = client.get("/host_data_node_ids?node_id=node1&node_id=node2",
+                              headers={"Authorization": f"Bearer {access_token}"})
         assert response.status_code == 200
-        assert response.json() == host_data
+        assert [item["host"] for item in response.json()] == ["host1", "host2"]
+        mock_get.assert_called_once_with(host_ids=["node1", "node2"], row_limit=301)
+        assert response.headers["X-Has-More"] == "false"
 
-        # Test job data ID not found
-        with patch.object(crud, "get_host_data_by_job_id", return_value=[]):
-            response = client.get("/host_data_job_id/invalid_job_data_id",
+        # Test node IDs not found
+        with patch.object(crud, "get_host_data_by_host_ids", return_value=[]):
+            response = client.get("/host_data_node_ids?node_id=invalid_node",
                                   headers={"Authorization": f"Bearer {access_token}"})
             assert response.status_code == 404
-            assert response.json()["detail"] == "Host data for job ID invalid_job_data_id not found"
+            assert response.json()["detail"] == "Host data for nodes invalid_node not found"
 
+        # Test a smaller limit, with more records than fit
+        response = client.get("/host_data_node_ids?node_id=node1&node_id=node2&limit=1",
+                              headers={"Authorization": f"Bearer {access_token}"})
+        assert [item["host"] for item in response.json()] == ["host1"]
+        assert response.headers["X-Has-More"] == "true"
+
+        # Test database connection failure
+        with patch.object(crud, "get_host_data_by_host_ids", return_value=None):
+            response = client.get("/host_data_node_ids?node_id=node1",
+                                  headers={"Authorization": f"Bearer {access_token}"})
+            assert response.status_code == 500
 
-def test_read_host_data_single_node(test_db):
-    # Create a test user and generate an access token
-    password = "test_password"
-    hashed_password = security.get_password_hash(password)
-    user = ApiUser(username="test_user", password_hash=hashed_password)
-    db = TestingSessionLocal()
-    db.add(user)
-    db.commit()
-    access_token = create_access_token(data={"sub": user.username}, expires_delta=timedelta(minutes=30))
 
-    # Mock the crud.get_host_data_by_host_id function
-    host_data = [MagicMock()]
-    with patch.object(crud, "get_host_data_by_host_id", return_value=host_data):
-        # Test successful retrieval of host data
-        response = client.get("/host_data_node_id/test_node_id", headers={"Authorization": f"Bearer {access_token}"})
+def test_read_host_data_many_jobs(access_token):
+    # Mock the crud.get_host_data_by_job_ids function
+    host_data = [HostDataRecord(datetime(2024, 1, 1), "host1", jid, None, "cpu", "%", 1.0, None, None)
+                 for jid in ("job1", "job2")]
+    with patch.object(crud, "get_host_data_by_job_ids", return_value=host_data) as mock_get:
+        # Test successful retrieval of host data for several jobs in one call
+        response = client.get("/host_data_job_ids?job_data_id=job1&job_data_id=job2&limit=10",
+                              headers={"Authorization": f"Bearer {access_token}"})
         assert response.status_code == 200
-        assert response.json() == host_data
+        assert [record["jid"] for record in response.json()] == ["job1", "job2"]
+        mock_get.assert_called_once_with(job_data_ids=["job1", "job2"], row_limit_per_job=10)
 
-        # Test node ID not found
-        with patch.object(crud, "get_host_data_by_host_id", return_value=[]):
-            response = client.get("/host_data_node_id/invalid_node_id",
+        # Test job IDs not found
+        with patch.object(crud, "get_host_data_by_job_ids", return_value=[]):
+            response = client.get("/host_data_job_ids?job_data_id=invalid_job",
                                   headers={"Authorization": f"Bearer {access_token}"})
             assert response.status_code == 404
-            assert response.json()["detail"] == "Host data for node invalid_node_id not found"
+            assert response.json()["detail"] == "Host data for jobs invalid_job not found"
+
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timedelta
@@ -7,7 +8,8 @@ from jwt import PyJWTError
 import models
 from security import (
     verify_password, get_password_hash, create_access_token, get_user,
-    get_current_user, get_current_active_user
+    get_current_user, get_current_active_user, clear_user_cache, update_password_hash,
+    password_hash_needs_update
 )
 
 
@@ -19,6 +21,21 @@ def test_verify_password():
     assert verify_password("wrongpassword", hashed_password) == False
 
 
+def test_verify_password_caches_successful_verifications():
+    clear_user_cache()
+    hashed_password = get_password_hash("password123")
+
+    with patch("security.bcrypt.checkpw", return_value=True) as mock_verify:
+        assert verify_password("password123", hashed_password) == True
+        assert verify_password("password123", hashed_password) == True
+        assert mock_verify.call_count == 1
+
+    with patch("security.bcrypt.checkpw", return_value=False) as mock_verify:
+        assert verify_password("wrongpassword", hashed_password) == False
+        assert verify_password("wrongpassword", hashed_password) == False
+        assert mock_verify.call_count == 2
+
+
 def test_get_password_hash():
     plain_password = "password123"
     hashed_password = get_password_hash(plain_password)
@@ -27,6 +44,34 @@ def test_get_password_hash():
     assert hashed_password != plain_password
 
 
+def test_update_password_hash_uses_current_cost():
+    user = models.ApiUserRecord(1, "johndoe", "$2b$04$" + "a" * 53)
+    db = MagicMock()
+
+    update_password_hash(db, user, "password123")
+
+    password_hash = db.query.return_value.filter.return_value.update.call_args.args[0][models.ApiUser.password_hash]
+    assert verify_password("password123", password_hash) == True
+    assert password_hash_needs_update(password_hash) == False
+    db.commit.assert_called_once()
+
+
+def test_get_user_cached_per_username():
+    clear_user_cache()
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = (1, "johndoe", "hashedpassword")
+
+    assert get_user(db, "johndoe") == models.ApiUserRecord(1, "johndoe", "hashedpassword")
+    assert get_user(db, "johndoe") == models.ApiUserRecord(1, "johndoe", "hashedpassword")
+    db.query.return_value.filter.return_value.first.assert_called_once()
+
+
+def test_password_hash_needs_update():
+    assert password_hash_needs_update(get_password_hash("password123")) == False
+    assert password_hash_needs_update("$2a$10$" + "a" * 53) == True
+    assert password_hash_needs_update("$2b$04$" + "a" * 53) == True
+
+
 def test_create_access_token():
     data = {"sub": "johndoe"}
     expires_delta = timedelta(minutes=30)
@@ -90,4 +135,39 @@ async def test_get_current_active_user(db_session):
 
     with patch("your_module.get_current_user", return_value=user):
         current_active_user = await get_current_active_user()
-        assert current_active_user == user
\ No newline at end of file
+        assert current_active_user == user
+
+
+def test_get_current_user_cached_per_token():
+    clear_user_cache()
+    user = MagicMock(username="johndoe")
+    token = create_access_token({"sub": "johndoe"}, timedelta(minutes=30))
+
+    with patch("security.get_user", return_value=user) as mock_get_user:
+        assert asyncio.run(get_current_user(token, MagicMock())) is user
+        assert asyncio.run(get_current_user(token, MagicMock())) is user
+        assert mock_get_user.call_count == 1
+
+        clear_user_cache()
+        asyncio.run(get_current_user(token, MagicMock()))
+        assert mock_get_user.call_count == 2
+
+
+def test_get_current_user_rejects_invalid_token_from_cache():
+    clear_user_cache()
+
+    with patch("security._jwt_decoder.decode", side_effect=PyJWTError) as mock_decode:
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                asyncio.run(get_current_user("invalid_token", MagicMock()))
+        assert mock_decode.call_count == 1
+
+
+def test_get_current_user_requires_subject():
+    clear_user_cache()
+    token = create_access_token({"name": "johndoe"}, timedelta(minutes=30))
+
+    with patch("security.get_user") as mock_get_user:
+        with pytest.raises(HTTPException):
+            asyncio.run(get_current_user(token, MagicMock()))
+        mock_get_user.assert_not_called()